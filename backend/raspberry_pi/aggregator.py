@@ -0,0 +1,93 @@
+import numpy as np
+
+from scheduler import haversine_m
+
+
+class SegmentAggregator:
+    """
+    Group per-frame scores into road segments so the Pi reports per stretch of road.
+
+    A segment is closed once the vehicle has travelled `segment_m` from its first
+    frame, or after `max_duration_s` (which bounds segments while stationary). With
+    `flush_on_low`, good and damaged road never share a segment: a frame scoring below
+    `score_thresh` closes the open good segment and starts a low one, which collects
+    the following low frames (within the same length and duration limits) and is
+    closed as soon as the score recovers. Damaged stretches are thus reported as
+    soon as they end, and still one report per segment rather than per frame.
+
+    Every closed segment is passed to `emit` as a dict. It keeps the `latitude`,
+    `longitude`, `timestamp` and `score` fields of a per-frame report (end position,
+    worst frame time, mean score) so the dashboard can ingest it unchanged, plus the
+    segment details. Scores are reported on the same 0-100 scale as the frame reports.
+
+    Parameters:
+        emit (callable): Called with each closed segment record.
+        segment_m (float): Length of a segment in metres.
+        max_duration_s (float): Maximum duration of a segment in seconds.
+        score_thresh (float): Frame score (0-1) below which a frame counts as damaged.
+        flush_on_low (bool): Split segments where the score crosses `score_thresh`.
+    """
+
+    def __init__(self, emit, segment_m=10.0, max_duration_s=5.0, score_thresh=0.7, flush_on_low=True):
+        self.emit = emit
+        self.segment_m = segment_m
+        self.max_duration_s = max_duration_s
+        self.score_thresh = score_thresh
+        self.flush_on_low = flush_on_low
+
+        self.frames = 0
+        self.segments = 0
+        self._reset()
+
+    def add(self, lat, lng, t, timestamp, score):
+        """Add one frame score (0-1) at (lat, lng), time `t` in seconds."""
+        low = score < self.score_thresh
+        if self.flush_on_low and self._start is not None and low != self._low:
+            # The road changed between good and damaged: close the segment before this frame
+            self.flush()
+        if self._start is None:
+            self._start = (lat, lng, t, timestamp)
+            self._low = low
+        self._end = (lat, lng, t, timestamp)
+        self._scores.append(score)
+        if score < self._worst[0]:
+            self._worst = (score, timestamp)
+        self.frames += 1
+
+        start_lat, start_lng, start_t, _ = self._start
+        if (haversine_m(start_lat, start_lng, lat, lng) >= self.segment_m
+                or t - start_t >= self.max_duration_s):
+            self.flush()
+
+    def flush(self):
+        """Emit the open segment, if any."""
+        if not self._scores:
+            return
+        scores = np.asarray(self._scores)
+        start_lat, start_lng, _, start_time = self._start
+        end_lat, end_lng, _, end_time = self._end
+        mean = float(scores.mean())
+        record = {
+            "latitude": end_lat,
+            "longitude": end_lng,
+            "timestamp": self._worst[1],
+            "score": mean * 100,
+            "start_latitude": start_lat,
+            "start_longitude": start_lng,
+            "start_time": start_time,
+            "end_time": end_time,
+            "frames": len(scores),
+            "min_score": float(scores.min()) * 100,
+            "mean_score": mean * 100,
+            "p10_score": float(np.percentile(scores, 10)) * 100,
+        }
+        self.segments += 1
+        self._reset()
+        self.emit(record)
+
+    def _reset(self):
+        self._start = None
+        self._low = False
+        self._end = None
+        self._scores = []
+        self._worst = (float("inf"), None)
@@ -0,0 +1,150 @@
+import os
+import queue
+import re
+import shutil
+import threading
+
+import cv2
+import numpy as np
+
+
+class FrameArchiver:
+    """
+    Save a sample of the processed frames as JPEGs without slowing the frame loop.
+
+    `submit` decides whether a frame is kept, copies it and queues it; a small pool of
+    encoder threads does the JPEG encoding (which releases the GIL) and the disk
+    writes. When the queue is full the frame is dropped instead of waiting.
+
+    A frame is archived when it passes every enabled policy: it is every `every_n`-th
+    frame submitted, it has detections (`only_detections`), and it scores below
+    `below_score`. The sample counts submitted frames, not the caller's frame numbers,
+    so the rate holds when only some frames (e.g. inferred ones) are submitted.
+    Files go into numbered subdirectories of `root` (0000, 0001, ...); a new one is
+    started once the current one holds `max_dir_bytes`, and the oldest ones are
+    deleted to keep at most `max_dirs`, so the SD card never fills up.
+
+    Parameters:
+        root (str): Archive directory.
+        every_n (int): Keep only every n-th submitted frame. 1 keeps every frame.
+        only_detections (bool): Keep only frames with at least one detection.
+        below_score (float): Keep only frames scoring below this (0-1). None disables.
+        quality (int): JPEG quality (0-100).
+        max_dir_bytes (int): Size at which the archive moves on to a new directory.
+        max_dirs (int): Number of directories kept. None keeps all of them.
+        workers (int): Number of encoder threads.
+        queue_size (int): Frames waiting to be encoded before new ones are dropped.
+    """
+
+    def __init__(self, root="frames", every_n=1, only_detections=False, below_score=None, quality=80,
+                 max_dir_bytes=256 * 1024 * 1024, max_dirs=8, workers=2, queue_size=16):
+        self.root = root
+        self.every_n = max(1, every_n)
+        self.only_detections = only_detections
+        self.below_score = below_score
+        self.quality = quality
+        self.max_dir_bytes = max_dir_bytes
+        self.max_dirs = max_dirs
+
+        self.submitted = 0
+        self.archived = 0
+        self.dropped = 0
+        self.bytes_written = 0
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        existing = self._directories()
+        # Continue after the directories left by earlier runs
+        self._dir_index = existing[-1] + 1 if existing else 0
+        self._dir_bytes = 0
+        os.makedirs(self._dir_path(self._dir_index), exist_ok=True)
+        self._threads = [threading.Thread(target=self._run, name=f"archiver-{i}", daemon=True)
+                         for i in range(workers)]
+
+    def start(self):
+        for t in self._threads:
+            t.start()
+        return self
+
+    def wants(self, detections=None, score=None):
+        """Return True if the detection and score policies keep a frame."""
+        if self.only_detections and (detections is None or len(detections) == 0):
+            return False
+        if self.below_score is not None and (score is None or score >= self.below_score):
+            return False
+        return True
+
+    def submit(self, frame_num, frame, detections=None, score=None):
+        """Queue the frame for archiving if the policies keep it. Never blocks."""
+        sample = self.submitted % self.every_n
+        self.submitted += 1
+        if sample or not self.wants(detections, score):
+            return False
+        if self.queue.full():
+            self.dropped += 1
+            return False
+        # Copy: the caller reuses its frame buffers once this returns
+        try:
+            self.queue.put_nowait((frame_num, np.copy(frame)))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def stop(self):
+        """Encode what is queued and stop the encoder threads."""
+        for _ in self._threads:
+            self.queue.put(None)
+        for t in self._threads:
+            if t.is_alive():
+                t.join()
+        print(f"Archived {self.archived} frames ({self.bytes_written / 1e6:.1f} MB), dropped {self.dropped}.")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            frame_num, frame = job
+            ok, data = cv2.imencode(".jpg", frame, params)
+            if not ok:
+                print(f"Failed to encode frame {frame_num}")
+                continue
+            try:
+                self._write(f"frame_{frame_num}.jpg", data)
+            except OSError as e:
+                print(f"Failed to archive frame {frame_num}: {e}")
+
+    def _write(self, name, data):
+        with self._lock:
+            if self._dir_bytes >= self.max_dir_bytes:
+                self._rotate()
+            path = os.path.join(self._dir_path(self._dir_index), name)
+            self._dir_bytes += data.nbytes
+            self.bytes_written += data.nbytes
+            self.archived += 1
+        with open(path, "wb") as f:
+            f.write(data.tobytes())
+
+    def _rotate(self):
+        self._dir_index += 1
+        self._dir_bytes = 0
+        os.makedirs(self._dir_path(self._dir_index), exist_ok=True)
+        if self.max_dirs:
+            for index in self._directories()[:-self.max_dirs]:
+                shutil.rmtree(self._dir_path(index), ignore_errors=True)
+
+    def _dir_path(self, index):
+        return os.path.join(self.root, f"{index:04d}")
+
+    def _directories(self):
+        return sorted(int(name) for name in os.listdir(self.root)
+                      if re.fullmatch(r"\d{4,}", name) and os.path.isdir(os.path.join(self.root, name)))
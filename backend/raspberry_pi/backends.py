@@ -0,0 +1,163 @@
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+
+import cv2
+import numpy as np
+
+DEFAULT_WEIGHTS = "backend/raspberry_pi/weights/best.pt"
+BACKENDS = ("pytorch", "onnx", "openvino", "ncnn")
+IMAGE_SIZE = 640
+
+
+def exported_path(weights, backend, int8=False, imgsz=IMAGE_SIZE):
+    """Path of the file or directory the weights are exported to for a backend and input size."""
+    stem, _ = os.path.splitext(weights)
+    if backend == "pytorch":
+        return weights
+    # Exported models have a fixed input size; other sizes than the default get their own export
+    if imgsz != IMAGE_SIZE:
+        stem = f"{stem}_{imgsz}"
+    if backend == "onnx":
+        return f"{stem}_int8.onnx" if int8 else f"{stem}.onnx"
+    if backend == "openvino":
+        return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+    if backend == "ncnn":
+        return f"{stem}_ncnn_model"
+    raise ValueError(f"Unknown backend: {backend}")
+
+
+def export_weights(weights=DEFAULT_WEIGHTS, backend="onnx", int8=False, data=None, calib_size=200,
+                   imgsz=IMAGE_SIZE):
+    """
+    Export YOLO weights once for a CPU inference backend and return the exported path.
+
+    Parameters:
+        weights (str): Path to the PyTorch weights (.pt).
+        backend (str): One of "onnx", "openvino" or "ncnn".
+        int8 (bool): Apply int8 post-training quantization.
+        data (str): Dataset data.yaml (from models/prepare/dataset.sh) used for int8 calibration.
+        calib_size (int): Number of dataset images used for calibration.
+        imgsz (int): Model input size the export is fixed to.
+    """
+    if backend == "pytorch":
+        return weights
+    if int8 and data is None:
+        raise ValueError("int8 quantization needs a calibration dataset (data=.../data.yaml)")
+    if int8 and backend == "ncnn":
+        raise ValueError("int8 export is only supported for the onnx and openvino backends")
+
+    path = exported_path(weights, backend, int8, imgsz)
+    if os.path.exists(path):
+        return path
+
+    if backend == "openvino" and int8:
+        # OpenVINO calibrates on a fraction of the dataset during export
+        fraction = min(1.0, calib_size / max(1, len(_calibration_images(data))))
+        _export(weights, path, format="openvino", imgsz=imgsz, int8=True, data=data, fraction=fraction)
+    elif backend == "onnx" and int8:
+        fp32_path = export_weights(weights, "onnx", imgsz=imgsz)
+        _quantize_onnx(fp32_path, path, _calibration_images(data)[:calib_size], imgsz)
+    else:
+        _export(weights, path, format=backend, imgsz=imgsz)
+    print(f"Exported {weights} for {backend}{' int8' if int8 else ''} to {path}")
+    return path
+
+
+def _export(weights, path, **kwargs):
+    """Export with ultralytics and move the result to `path`, leaving other exports alone."""
+    # Imported here so the classifier path (model_server, run_model) does not need ultralytics
+    from ultralytics import YOLO
+
+    # ultralytics writes next to the weights under a name that ignores imgsz, which would
+    # overwrite the default-size export; export a copy in a scratch directory instead
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as scratch:
+        copy = os.path.join(scratch, os.path.basename(weights))
+        shutil.copy2(weights, copy)
+        exported = YOLO(copy).export(**kwargs)
+        os.replace(exported, path)
+
+
+def load_model(weights=DEFAULT_WEIGHTS, backend="pytorch", int8=False, data=None, imgsz=IMAGE_SIZE):
+    """
+    Load a YOLO model for the configured backend, exporting the weights first if needed
+    (at `imgsz`, the input size the model will be called with).
+
+    Every backend is wrapped by ultralytics, so callers get the same `Results` and
+    box outputs as with the PyTorch weights.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}")
+    from ultralytics import YOLO
+
+    path = export_weights(weights, backend, int8, data, imgsz=imgsz)
+    return YOLO(path, task="detect")
+
+
+def _calibration_images(data):
+    """List the validation (or training) images of a YOLO dataset data.yaml."""
+    import yaml
+
+    with open(data) as f:
+        config = yaml.safe_load(f)
+    root = os.path.dirname(os.path.abspath(data))
+    candidates = []
+    for split in ("val", "train"):
+        entry = config.get(split)
+        if isinstance(entry, str):
+            candidates.append(os.path.join(root, entry))
+    # Roboflow exports use "../valid/images" paths relative to the project folder
+    candidates += [os.path.join(root, "valid", "images"), os.path.join(root, "train", "images")]
+
+    for folder in candidates:
+        images = sorted(glob.glob(os.path.join(folder, "*.jpg")) + glob.glob(os.path.join(folder, "*.png")))
+        if images:
+            return images
+    raise FileNotFoundError(f"No calibration images found for {data}")
+
+
+def _letterbox(image, size=IMAGE_SIZE):
+    """Resize keeping aspect ratio and pad to a square, as ultralytics does."""
+    h, w = image.shape[:2]
+    scale = size / max(h, w)
+    resized = cv2.resize(image, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top = (size - resized.shape[0]) // 2
+    left = (size - resized.shape[1]) // 2
+    canvas[top:top + resized.shape[0], left:left + resized.shape[1]] = resized
+    return canvas
+
+
+def _quantize_onnx(fp32_path, int8_path, images, imgsz=IMAGE_SIZE):
+    from onnxruntime.quantization import CalibrationDataReader, QuantType, quantize_static
+    import onnxruntime
+
+    input_name = onnxruntime.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.images = iter(images)
+
+        def get_next(self):
+            path = next(self.images, None)
+            if path is None:
+                return None
+            image = _letterbox(cv2.imread(path), imgsz)[:, :, ::-1]  # BGR to RGB
+            tensor = np.ascontiguousarray(image.transpose(2, 0, 1), dtype=np.float32)[None] / 255.0
+            return {input_name: tensor}
+
+    quantize_static(fp32_path, int8_path, Reader(), weight_type=QuantType.QInt8, activation_type=QuantType.QUInt8)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export YOLO weights for a CPU inference backend")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS)
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="onnx")
+    parser.add_argument("--int8", action="store_true", help="int8 post-training quantization")
+    parser.add_argument("--data", help="dataset data.yaml used for int8 calibration")
+    parser.add_argument("--calib-size", type=int, default=200)
+    parser.add_argument("--imgsz", type=int, default=IMAGE_SIZE, help="model input size (process_video's input_size)")
+    args = parser.parse_args()
+    export_weights(args.weights, args.backend, args.int8, args.data, args.calib_size, args.imgsz)
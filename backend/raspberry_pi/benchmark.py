@@ -0,0 +1,79 @@
+import argparse
+import json
+import platform
+
+from predict import process_video
+
+# Configurations compared by default; each maps to process_video keyword arguments
+CONFIGS = {
+    "every_frame": {"min_spacing_m": 0, "change_thresh": None},
+    "scheduled": {},
+    "scheduled_onnx": {"backend": "onnx"},
+    "scheduled_roi": {"roi": (0.0, 0.4, 1.0, 1.0)},
+}
+
+TABLE_STAGES = ("decode", "model", "score", "sink")
+
+
+def run_benchmark(video_path, configs, max_frames=None, repeat=1, **common):
+    """
+    Run the same video through `process_video` once per configuration and repeat.
+
+    Every run is headless and uploads nothing, so only the frame loop is measured.
+    Returns one row per run with the configuration name and its metrics snapshot.
+    """
+    rows = []
+    for name, config in configs.items():
+        for run in range(repeat):
+            kwargs = dict(common, headless=True, dashboard_url=None, max_frames=max_frames)
+            kwargs.update(config)
+            print(f"=== {name} (run {run + 1}/{repeat}) ===")
+            snapshot = process_video(video_path, **kwargs)
+            if snapshot is None:
+                raise Exception(f"Could not process {video_path}")
+            rows.append({"config": name, "run": run, "settings": config, "metrics": snapshot})
+    return rows
+
+
+def format_table(rows, stages=TABLE_STAGES):
+    """Comparison table: steady-state throughput plus p50/p95 latency (ms) of the main stages."""
+    header = f"{'config':<16} {'frames':>7} {'fps':>7}" + "".join(f" {s + ' p50/p95':>18}" for s in stages)
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        m = row["metrics"]
+        line = f"{row['config']:<16} {m['frames']:>7} {m['steady_fps']:>7.1f}"
+        for stage in stages:
+            s = m["stages"].get(stage)
+            line += f" {s['p50_ms']:>8.1f}/{s['p95_ms']:<8.1f}" if s else f" {'-':>18}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the edge frame loop under several configurations")
+    parser.add_argument("video", help="fixed video used for every run")
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS),
+                        help=f"configurations to run (default: all of {', '.join(CONFIGS)})")
+    parser.add_argument("--config-file", help="JSON file of extra configurations: {name: {process_video kwargs}}")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--out", help="write every run's metrics to this JSON file")
+    args = parser.parse_args()
+
+    available = dict(CONFIGS)
+    if args.config_file:
+        with open(args.config_file) as f:
+            available.update(json.load(f))
+        if args.configs == list(CONFIGS):
+            args.configs = list(available)
+    unknown = [name for name in args.configs if name not in available]
+    if unknown:
+        parser.error(f"unknown configurations: {', '.join(unknown)}")
+
+    rows = run_benchmark(args.video, {name: available[name] for name in args.configs},
+                         args.max_frames, args.repeat)
+    print(format_table(rows))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"video": args.video, "max_frames": args.max_frames, "machine": platform.platform(),
+                       "runs": rows}, f, indent=2)
@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+
+
+class ChangeGate:
+    """
+    Cheap pre-inference check that skips frames showing the same scene as the last one.
+
+    Each frame is reduced to a tiny grayscale thumbnail (sampled from a strided view,
+    so the full frame is never converted). When its mean absolute difference from the
+    thumbnail of the last inferred frame stays below `threshold`, the previous
+    detections and score can be reused. Comparing against the last inferred frame
+    rather than the previous one catches slow drift as well.
+
+    Parameters:
+        threshold (float): Mean absolute thumbnail difference (0-255) that counts as a change.
+        size (tuple): Thumbnail (width, height).
+        max_skip (int): Force inference after this many skipped frames in a row.
+    """
+
+    def __init__(self, threshold=4.0, size=(32, 18), max_skip=150):
+        self.threshold = threshold
+        self.size = size
+        self.max_skip = max_skip
+
+        self.inferred = 0
+        self.skipped = 0
+        self._reference = None
+        self._run = 0
+
+    def signature(self, frame):
+        """Tiny float32 grayscale thumbnail of the frame."""
+        height, width = frame.shape[:2]
+        step = max(1, min(width // (self.size[0] * 4), height // (self.size[1] * 4)))
+        small = cv2.resize(frame[::step, ::step], self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.float32)
+
+    def should_infer(self, frame):
+        """Return True if the scene changed enough since the last inferred frame."""
+        thumb = self.signature(frame)
+        if (self._reference is None or self._run >= self.max_skip
+                or float(np.abs(thumb - self._reference).mean()) >= self.threshold):
+            self._reference = thumb
+            self._run = 0
+            self.inferred += 1
+            return True
+        self._run += 1
+        self.skipped += 1
+        return False
+
+    def stats(self):
+        total = self.inferred + self.skipped
+        saved = 100.0 * self.skipped / total if total else 0.0
+        return f"Change gate: inferred {self.inferred}, skipped {self.skipped} ({saved:.1f}% saved)"
@@ -0,0 +1,213 @@
+import json
+import multiprocessing as mp
+import os
+
+import cv2
+import numpy as np
+
+_OPEN = "open"
+_FRAME = "frame"
+_CLOSE = "close"
+
+
+def _encoder_main(jobs, pending_bytes, out_dir, index_path, fourcc, fps):
+    """Encoder process: write the clip frames it receives and append each finished clip to the index."""
+    writer = None
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        kind, payload = job
+        if kind == _OPEN:
+            name, (width, height) = payload
+            writer = cv2.VideoWriter(os.path.join(out_dir, name), cv2.VideoWriter_fourcc(*fourcc), fps,
+                                     (width, height))
+        elif kind == _FRAME:
+            if writer is not None:
+                writer.write(payload)
+            with pending_bytes.get_lock():
+                pending_bytes.value -= payload.nbytes
+        elif kind == _CLOSE:
+            if writer is not None:
+                writer.release()
+                writer = None
+            with open(index_path, "a") as f:
+                f.write(json.dumps(payload) + "\n")
+    if writer is not None:
+        writer.release()
+
+
+class ClipRecorder:
+    """
+    Record short clips around low-score events instead of the whole drive.
+
+    The last `pre_roll_s` seconds of frames are copied into a preallocated in-memory
+    ring. When a frame scores below `score_thresh`, the ring (pre-roll), the event
+    frame and the next `post_roll_s` seconds (post-roll) are sent to a background
+    encoder process that writes them as one clip. Further low frames during the
+    post-roll extend the same clip, up to `max_clip_s`. Every clip gets a line in
+    `index.jsonl` with its file name, the GPS position, time and score of its worst
+    frame (0-100, like the dashboard reports), the time of the first low frame, its
+    end time and the length of its pre-roll.
+
+    The frame loop only copies frames; encoding happens in the other process, and
+    frames are dropped (and counted) rather than waiting if the encoder falls behind.
+    Memory stays bounded on small boards: frames are downscaled by `scale` before
+    they are kept, the pre-roll ring is shortened to fit `max_ring_bytes`, and at
+    most `max_pending_bytes` of frames wait for the encoder at any time.
+
+    Parameters:
+        out_dir (str): Directory for the clips and the index file.
+        fps (float): Frame rate of the source, used for the roll lengths and the clips.
+        pre_roll_s (float): Seconds of video kept before an event.
+        post_roll_s (float): Seconds of video recorded after the last low frame.
+        score_thresh (float): Frame score (0-1) below which an event fires.
+        max_clip_s (float): Longest clip; a longer event is split into several clips.
+        scale (float): Resize factor for recorded frames.
+        fourcc (str): Codec of the clips.
+        max_ring_bytes (int): Memory for the pre-roll ring; a longer pre-roll is cut.
+        max_pending_bytes (int): Bytes of frames waiting for the encoder before new
+            ones are dropped.
+    """
+
+    def __init__(self, out_dir="clips", fps=30.0, pre_roll_s=3.0, post_roll_s=3.0, score_thresh=0.7,
+                 max_clip_s=30.0, scale=0.5, fourcc="mp4v", max_ring_bytes=64 * 1024 * 1024,
+                 max_pending_bytes=64 * 1024 * 1024):
+        self.out_dir = out_dir
+        self.fps = fps or 30.0
+        self.pre_frames = max(0, int(round(pre_roll_s * self.fps)))
+        self.post_frames = max(1, int(round(post_roll_s * self.fps)))
+        self.max_frames = max(1, int(round(max_clip_s * self.fps)))
+        self.score_thresh = score_thresh
+        self.scale = scale
+        self.max_ring_bytes = max_ring_bytes
+        self.max_pending_bytes = max_pending_bytes
+        self.index_path = os.path.join(out_dir, "index.jsonl")
+
+        self.clips = 0
+        self.dropped = 0
+
+        os.makedirs(out_dir, exist_ok=True)
+        self._jobs = mp.Queue()
+        self._pending_bytes = mp.Value("q", 0)
+        self._process = mp.Process(target=_encoder_main, name="clip-encoder", daemon=True,
+                                   args=(self._jobs, self._pending_bytes, out_dir, self.index_path, fourcc,
+                                         self.fps))
+        self._ring = None
+        self._ring_size = 0
+        self._ring_next = 0
+        self._ring_count = 0
+        self._clip = None
+
+    def start(self):
+        self._process.start()
+        return self
+
+    def add(self, frame, lat, lng, timestamp, score):
+        """Add one frame with its position and score (0-1); starts or extends a clip on low scores."""
+        low = score < self.score_thresh
+        if self._clip is not None:
+            self._send(_FRAME, self._prepare(frame))
+            clip = self._clip
+            clip["frames"] += 1
+            clip["end_time"] = timestamp
+            if low:
+                clip["remaining"] = self.post_frames
+                if score < clip["score"]:
+                    clip.update(score=score, latitude=lat, longitude=lng, timestamp=timestamp)
+            else:
+                clip["remaining"] -= 1
+            if clip["remaining"] <= 0 or clip["frames"] >= self.max_frames:
+                self._finish()
+            return
+
+        if low:
+            self._begin(frame, lat, lng, timestamp, score)
+        else:
+            self._remember(frame)
+
+    def stop(self, timeout=30.0):
+        """Close the open clip, wait for the encoder to write everything and stop it."""
+        if self._process.pid is None:
+            # Never started: there is no encoder to stop
+            return
+        if self._clip is not None:
+            self._finish()
+        self._jobs.put(None)
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+        print(f"Recorded {self.clips} clips, dropped {self.dropped} frames.")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _prepare(self, frame):
+        if self.scale != 1.0:
+            return cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return frame
+
+    def _remember(self, frame):
+        if not self.pre_frames:
+            return
+        frame = self._prepare(frame)
+        if self._ring is None or self._ring.shape[1:] != frame.shape:
+            self._ring_size = max(1, min(self.pre_frames, self.max_ring_bytes // frame.nbytes))
+            if self._ring_size < self.pre_frames:
+                print(f"Clip pre-roll cut to {self._ring_size / self.fps:.1f}s to fit in "
+                      f"{self.max_ring_bytes // (1024 * 1024)} MB; lower `scale` for a longer one")
+            self._ring = np.empty((self._ring_size,) + frame.shape, dtype=frame.dtype)
+            self._ring_next = 0
+            self._ring_count = 0
+        np.copyto(self._ring[self._ring_next], frame)
+        self._ring_next = (self._ring_next + 1) % self._ring_size
+        self._ring_count = min(self._ring_count + 1, self._ring_size)
+
+    def _begin(self, frame, lat, lng, timestamp, score):
+        frame = self._prepare(frame)
+        name = f"clip_{timestamp.replace(' ', '_').replace(':', '-')}_{self.clips}.mp4"
+        height, width = frame.shape[:2]
+        self._send(_OPEN, (name, (width, height)))
+        # Pre-roll, oldest frame first
+        pre = self._ring_count
+        start = (self._ring_next - pre) % self._ring_size if pre else 0
+        for i in range(pre):
+            self._send(_FRAME, self._ring[(start + i) % self._ring_size])
+        self._send(_FRAME, frame)
+        self._ring_count = 0
+
+        self._clip = {
+            "clip": name,
+            "latitude": lat,
+            "longitude": lng,
+            "timestamp": timestamp,
+            "score": score,
+            "event_time": timestamp,
+            "end_time": timestamp,
+            "pre_roll_s": pre / self.fps,
+            "frames": pre + 1,
+            "remaining": self.post_frames,
+        }
+
+    def _finish(self):
+        clip = self._clip
+        self._clip = None
+        del clip["remaining"]
+        clip["score"] = clip["score"] * 100
+        self.clips += 1
+        self._send(_CLOSE, clip)
+
+    def _send(self, kind, payload):
+        if kind == _FRAME:
+            # Frames queued but not yet encoded are bounded by bytes, not by count
+            with self._pending_bytes.get_lock():
+                if self._pending_bytes.value + payload.nbytes > self.max_pending_bytes:
+                    self.dropped += 1
+                    return
+                self._pending_bytes.value += payload.nbytes
+            # The queue pickles in a background thread, after the caller has reused the buffer
+            payload = np.copy(payload)
+        self._jobs.put((kind, payload))
@@ -0,0 +1,222 @@
+import numpy as np
+
+# Constant-velocity model over (cx, cy, w, h) and their velocities, one step per update
+_F = np.eye(8)
+_F[:4, 4:] = np.eye(4)
+_H = np.eye(4, 8)
+_STD_POSITION = 1.0 / 20
+_STD_VELOCITY = 1.0 / 160
+
+# Tracking needs the same defect in several nearly consecutive frames: at most this
+# many metres of travel between inferred frames (every frame above ~27 km/h at 30 FPS,
+# every few frames when slower), and detections down to this confidence for the
+# second matching pass
+TRACK_SPACING_M = 0.25
+TRACK_LOW_CONF = 0.1
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+def _buffered(boxes, buffer):
+    """Grow (N, 4) xyxy boxes by `buffer` times their size on every side."""
+    pad = np.stack([boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], axis=1) * buffer
+    return np.concatenate([boxes[:, :2] - pad, boxes[:, 2:4] + pad], axis=1)
+
+
+def _greedy_match(iou, thresh):
+    """Pair rows and columns by descending IoU. Returns the matches and the unmatched rows and columns."""
+    matches = []
+    if iou.size:
+        iou = iou.copy()
+        while True:
+            row, col = np.unravel_index(np.argmax(iou), iou.shape)
+            if iou[row, col] < thresh:
+                break
+            matches.append((row, col))
+            iou[row, :] = -1
+            iou[:, col] = -1
+    rows = set(range(iou.shape[0])) - {r for r, _ in matches}
+    cols = set(range(iou.shape[1])) - {c for _, c in matches}
+    return matches, sorted(rows), sorted(cols)
+
+
+def _xyxy_to_xywh(box):
+    x1, y1, x2, y2 = box
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1])
+
+
+class _Track:
+    def __init__(self, track_id, detection, frame_index, lat, lng, timestamp):
+        self.id = track_id
+        w, h = detection[2] - detection[0], detection[3] - detection[1]
+        self.mean = np.zeros(8)
+        self.mean[:4] = _xyxy_to_xywh(detection[:4])
+        std = np.array([2 * _STD_POSITION * w, 2 * _STD_POSITION * h, 2 * _STD_POSITION * w, 2 * _STD_POSITION * h,
+                        10 * _STD_VELOCITY * w, 10 * _STD_VELOCITY * h, 10 * _STD_VELOCITY * w, 10 * _STD_VELOCITY * h])
+        self.covariance = np.diag(std ** 2)
+        self.hits = 0
+        self.missed = 0
+        self.peak_conf = -1.0
+        self.first_seen = timestamp
+        self._observe(detection, frame_index, lat, lng, timestamp)
+
+    def predict(self):
+        w, h = max(self.mean[2], 1.0), max(self.mean[3], 1.0)
+        std = np.array([_STD_POSITION * w, _STD_POSITION * h, _STD_POSITION * w, _STD_POSITION * h,
+                        _STD_VELOCITY * w, _STD_VELOCITY * h, _STD_VELOCITY * w, _STD_VELOCITY * h])
+        self.mean = _F @ self.mean
+        self.covariance = _F @ self.covariance @ _F.T + np.diag(std ** 2)
+
+    def update(self, detection, frame_index, lat, lng, timestamp):
+        w, h = max(self.mean[2], 1.0), max(self.mean[3], 1.0)
+        std = np.array([_STD_POSITION * w, _STD_POSITION * h, _STD_POSITION * w, _STD_POSITION * h])
+        projected = _H @ self.covariance @ _H.T + np.diag(std ** 2)
+        gain = np.linalg.solve(projected, _H @ self.covariance).T
+        self.mean = self.mean + gain @ (_xyxy_to_xywh(detection[:4]) - _H @ self.mean)
+        self.covariance = self.covariance - gain @ projected @ gain.T
+        self.missed = 0
+        self._observe(detection, frame_index, lat, lng, timestamp)
+
+    def box(self):
+        cx, cy, w, h = self.mean[:4]
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+    def _observe(self, detection, frame_index, lat, lng, timestamp):
+        self.hits += 1
+        self.last_seen = timestamp
+        conf = float(detection[4])
+        if conf > self.peak_conf:
+            self.peak_conf = conf
+            self.cls = int(detection[5])
+            self.best = (frame_index, lat, lng, timestamp, [float(v) for v in detection[:4]])
+
+    def event(self):
+        frame_index, lat, lng, timestamp, box = self.best
+        return {
+            "defect_id": self.id,
+            "class": self.cls,
+            "confidence": self.peak_conf,
+            "frame": frame_index,
+            "latitude": lat,
+            "longitude": lng,
+            "timestamp": timestamp,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "frames": self.hits,
+            "box": box,
+        }
+
+
+class DefectTracker:
+    """
+    Follow detected defects across frames so each one is reported once.
+
+    ByteTrack-style association: every track's box is predicted with a constant-
+    velocity Kalman filter, then matched to the high-confidence detections by IoU
+    (of boxes grown by `match_buffer`, since a pothole approaching at speed moves
+    about its own height between frames before the filter has a velocity),
+    and tracks still unmatched get a second chance against the low-confidence ones
+    (a pothole seen at a shallow angle often drops in confidence before leaving the
+    frame). Unmatched high-confidence detections start new tracks.
+
+    Updates should come from nearly consecutive frames (see TRACK_SPACING_M): with
+    the frames a sparse scheduler lets through, boxes jump too far to match.
+
+    A track ends once it has gone `max_age` updates without a match. If it was seen
+    in at least `min_hits` frames, `emit` is called with one event holding its ID, the
+    class and frame index at its peak confidence, and the GPS position and time of
+    that frame.
+
+    Parameters:
+        emit (callable): Called with the event dict of each finished track.
+        high_thresh (float): Confidence splitting high from low detections; only
+            high ones start tracks. Keep it at the detector's `conf_thresh`.
+        low_thresh (float): Detections below this are ignored.
+        match_iou (float): Minimum IoU to match a high-confidence detection.
+        low_match_iou (float): Minimum IoU to match a low-confidence detection.
+        match_buffer (float): Fraction of its size every box grows by on each side
+            before the IoU is computed.
+        max_age (int): Updates a track survives without a match.
+        min_hits (int): Matched frames needed before a track is reported.
+    """
+
+    def __init__(self, emit, high_thresh=0.25, low_thresh=TRACK_LOW_CONF, match_iou=0.2, low_match_iou=0.5,
+                 match_buffer=0.5, max_age=5, min_hits=3):
+        self.emit = emit
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.match_buffer = match_buffer
+        self.max_age = max_age
+        self.min_hits = min_hits
+
+        self.tracks = []
+        self.defects = 0
+        self._next_id = 1
+
+    def update(self, detections, frame_index, lat, lng, timestamp):
+        """
+        Advance the tracks by one inferred frame.
+
+        Parameters:
+            detections (np.ndarray): (N, 6) rows of x1, y1, x2, y2, conf, cls.
+            frame_index (int): Index of the frame in the video.
+            lat, lng (float): Position of the frame.
+            timestamp (str): Time of the frame.
+        """
+        for track in self.tracks:
+            track.predict()
+
+        conf = detections[:, 4]
+        high = detections[conf >= self.high_thresh]
+        low = detections[(conf >= self.low_thresh) & (conf < self.high_thresh)]
+        track_boxes = _buffered(np.array([t.box() for t in self.tracks]).reshape(-1, 4), self.match_buffer)
+        high_boxes = _buffered(high[:, :4], self.match_buffer)
+        low_boxes = _buffered(low[:, :4], self.match_buffer)
+
+        # First pass: all tracks against the confident detections
+        matches, unmatched, new = _greedy_match(iou_matrix(track_boxes, high_boxes), self.match_iou)
+        for t, d in matches:
+            self.tracks[t].update(high[d], frame_index, lat, lng, timestamp)
+
+        # Second pass: leftover tracks against the weak detections
+        matches, unmatched_low, _ = _greedy_match(iou_matrix(track_boxes[unmatched], low_boxes),
+                                                  self.low_match_iou)
+        for t, d in matches:
+            self.tracks[unmatched[t]].update(low[d], frame_index, lat, lng, timestamp)
+
+        alive = []
+        for i in unmatched_low:
+            self.tracks[unmatched[i]].missed += 1
+        for track in self.tracks:
+            if track.missed > self.max_age:
+                self._finish(track)
+            else:
+                alive.append(track)
+        for d in new:
+            alive.append(_Track(self._next_id, high[d], frame_index, lat, lng, timestamp))
+            self._next_id += 1
+        self.tracks = alive
+
+    def flush(self):
+        """End every open track, e.g. at the end of the video."""
+        for track in self.tracks:
+            self._finish(track)
+        self.tracks = []
+
+    def _finish(self, track):
+        if track.hits >= self.min_hits:
+            self.defects += 1
+            self.emit(track.event())
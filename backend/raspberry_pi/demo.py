@@ -1,3 +1,5 @@
 from predict import process_video
 
-process_video("/home/sokhib/Desktop/sokhib/Projects/univ/road-condition-reporter/backend/raspberry_pi/sample_video_1.mp4", conf_thresh=0.25, iou_thresh=0.5, save=False)
+# The clip encoder is a spawned process, which re-imports this script
+if __name__ == "__main__":
+    process_video("/home/sokhib/Desktop/sokhib/Projects/univ/road-condition-reporter/backend/raspberry_pi/sample_video_1.mp4", conf_thresh=0.25, iou_thresh=0.5, save=False)
@@ -0,0 +1,179 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from gps_track import format_time
+from scoring import filter_detections, score_detections
+
+# Thresholds used while recording, loose enough for any later sweep
+CACHE_CONF = 0.05
+CACHE_IOU = 0.9
+
+_HASH_CHUNK = 4 * 1024 * 1024
+
+
+def video_hash(path):
+    """Hash of a video's size and its first and last 4 MB, cheap even for long drives."""
+    h = hashlib.sha1()
+    size = os.path.getsize(path)
+    h.update(str(size).encode())
+    with open(path, "rb") as f:
+        h.update(f.read(_HASH_CHUNK))
+        if size > _HASH_CHUNK:
+            f.seek(max(_HASH_CHUNK, size - _HASH_CHUNK))
+            h.update(f.read(_HASH_CHUNK))
+    return h.hexdigest()
+
+
+def model_hash(weights, backend="pytorch", int8=False, roi=None, input_size=640):
+    """Hash of the weights file and every setting that changes the raw detections."""
+    h = hashlib.sha1()
+    with open(weights, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    h.update(json.dumps([backend, int8, roi, input_size]).encode())
+    return h.hexdigest()
+
+
+def settings_hash(settings):
+    """Hash of the run settings that decide which frames get detections cached."""
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+
+def cache_path(cache_dir, video_path, weights, backend="pytorch", int8=False, roi=None, input_size=640,
+               settings=None):
+    """
+    Cache file for a video processed with a model, preprocessing and run settings.
+
+    Parameters:
+        settings (dict): Everything else that changes which frames are inferred, e.g.
+            the scheduler and change gate settings and the number of frames processed.
+    """
+    name = (f"{video_hash(video_path)[:16]}_{model_hash(weights, backend, int8, roi, input_size)[:16]}"
+            f"_{settings_hash(settings or {})[:16]}.npz")
+    return os.path.join(cache_dir, name)
+
+
+class DetectionRecorder:
+    """
+    Collect the raw per-frame detections of a run and save them as a columnar cache.
+
+    Detections are recorded in ROI coordinates with the loose CACHE_CONF/CACHE_IOU
+    thresholds, so `DetectionCache.rescore` can apply any stricter confidence and NMS
+    threshold later and reproduce what a run with those thresholds would have scored.
+
+    Parameters:
+        path (str): Cache file to write (.npz).
+        meta (dict): Run settings stored alongside the detections.
+    """
+
+    def __init__(self, path, meta=None):
+        self.path = path
+        self.meta = dict(meta or {}, conf=CACHE_CONF, iou=CACHE_IOU)
+        self._frames = []
+        self._detections = []
+
+    def add(self, frame_index, t, lat, lng, detections, width, height):
+        self._frames.append((frame_index, t, lat, lng, width, height, len(detections)))
+        self._detections.append(detections)
+
+    def save(self):
+        frames = np.array(self._frames, dtype=np.float64).reshape(-1, 7)
+        detections = np.concatenate(self._detections) if self._detections else np.zeros((0, 6), np.float32)
+        offsets = np.zeros(len(frames) + 1, dtype=np.int64)
+        np.cumsum(frames[:, 6], out=offsets[1:])
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(tmp_path,
+                 frame=frames[:, 0].astype(np.int64), t=frames[:, 1], lat=frames[:, 2], lng=frames[:, 3],
+                 width=frames[:, 4].astype(np.int32), height=frames[:, 5].astype(np.int32), offsets=offsets,
+                 boxes=detections[:, :4].astype(np.float32), conf=detections[:, 4].astype(np.float32),
+                 cls=detections[:, 5].astype(np.int16), meta=np.array(json.dumps(self.meta)))
+        os.replace(tmp_path, self.path)
+        print(f"Cached {len(detections)} detections of {len(frames)} frames in {self.path}")
+
+
+class DetectionCache:
+    """
+    Detections saved by a DetectionRecorder, re-scored without running the model.
+
+    Parameters:
+        path (str): Cache file (.npz).
+    """
+
+    def __init__(self, path):
+        with np.load(path) as data:
+            self.frame = data["frame"]
+            self.t = data["t"]
+            self.lat = data["lat"]
+            self.lng = data["lng"]
+            self.width = data["width"]
+            self.height = data["height"]
+            self.offsets = data["offsets"]
+            self.detections = np.column_stack([data["boxes"], data["conf"], data["cls"].astype(np.float32)])
+            self.meta = json.loads(str(data["meta"]))
+
+    def __len__(self):
+        return len(self.frame)
+
+    def rescore(self, conf_thresh=0.25, iou_thresh=0.5, class_weights=None):
+        """Return the score (0-1) of every cached frame under new thresholds."""
+        scores = np.ones(len(self), dtype=np.float64)
+        # Drop low-confidence rows for all frames at once; only frames left with boxes need work
+        kept = np.concatenate([[0], np.cumsum(self.detections[:, 4] >= conf_thresh)])
+        counts = kept[self.offsets[1:]] - kept[self.offsets[:-1]]
+        for i in np.flatnonzero(counts):
+            start, end = self.offsets[i], self.offsets[i + 1]
+            detections = filter_detections(self.detections[start:end], conf_thresh, iou_thresh)
+            scores[i], _ = score_detections(detections, self.width[i], self.height[i], class_weights)
+        return scores
+
+    def write_csv(self, path, scores):
+        """Write scores in the reprocess CSV format (latitude, longitude, timestamp, score 0-100)."""
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["latitude", "longitude", "timestamp", "score"])
+            for lat, lng, t, score in zip(self.lat, self.lng, self.t, scores):
+                writer.writerow([lat, lng, format_time(t), score * 100])
+
+
+def sweep(path, confs, ious, score_threshs, class_weights=None):
+    """Re-score a cache for every threshold combination and print a comparison table."""
+    cache = DetectionCache(path)
+    print(f"{len(cache)} frames, {len(cache.detections)} cached detections, recorded with {cache.meta}")
+    print(f"{'conf':>6} {'iou':>6} {'score_thresh':>12} {'mean':>7} {'low %':>7} {'frames/s':>10}")
+    rows = []
+    for conf in confs:
+        for iou in ious:
+            start = time.perf_counter()
+            scores = cache.rescore(conf, iou, class_weights)
+            fps = len(scores) / max(time.perf_counter() - start, 1e-9)
+            for score_thresh in score_threshs:
+                low = 100.0 * float((scores < score_thresh).mean()) if len(scores) else 0.0
+                mean = float(scores.mean()) if len(scores) else 1.0
+                rows.append((conf, iou, score_thresh, mean, low))
+                print(f"{conf:>6.2f} {iou:>6.2f} {score_thresh:>12.2f} {mean:>7.3f} {low:>7.1f} {fps:>10.0f}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score cached detections with new thresholds")
+    parser.add_argument("cache", help="cache file written by process_video(cache_dir=...)")
+    parser.add_argument("--conf", type=float, nargs="+", default=[0.25])
+    parser.add_argument("--iou", type=float, nargs="+", default=[0.5])
+    parser.add_argument("--score-thresh", type=float, nargs="+", default=[0.7])
+    parser.add_argument("--class-weights", type=json.loads, default=None,
+                        help='JSON weight per class ID, e.g. \'{"0": 2.0}\'')
+    parser.add_argument("--csv", help="write the per-frame scores of the first conf/iou pair to this CSV")
+    args = parser.parse_args()
+    weights = {int(k): v for k, v in args.class_weights.items()} if args.class_weights else None
+    sweep(args.cache, args.conf, args.iou, args.score_thresh, weights)
+    if args.csv:
+        cache = DetectionCache(args.cache)
+        cache.write_csv(args.csv, cache.rescore(args.conf[0], args.iou[0], weights))
@@ -0,0 +1,98 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class BatchInferenceEngine:
+    """
+    Share one YOLO model between several camera streams by micro-batching their frames.
+
+    Each stream calls `infer(frame)` from its own pipeline. The engine thread gathers
+    pending frames into one batched model call, up to `max_batch` frames or until the
+    oldest frame has waited `max_latency_s`, and hands each stream back its own result.
+
+    Parameters:
+        model: Warmed-up detector (see model_server.get_detector), which runs every
+            batch at the input size it was loaded for.
+        max_batch (int): Maximum number of frames per model call.
+        max_latency_s (float): Maximum time the first frame of a batch waits for others.
+        conf_thresh (float): Confidence threshold for detection.
+        iou_thresh (float): IoU threshold for detection.
+    """
+
+    def __init__(self, model, max_batch=4, max_latency_s=0.02, conf_thresh=0.25, iou_thresh=0.5):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_latency_s = max_latency_s
+        self.conf_thresh = conf_thresh
+        self.iou_thresh = iou_thresh
+
+        self.batches = 0
+        self.frames = 0
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="engine", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._requests.put(_STOP)
+        self._thread.join()
+        if self.batches:
+            print(f"Engine ran {self.frames} frames in {self.batches} batches "
+                  f"(mean batch {self.frames / self.batches:.2f}).")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def submit(self, frame):
+        """Queue a frame and return a Future resolving to its list of Results."""
+        future = Future()
+        self._requests.put((frame, future))
+        return future
+
+    def infer(self, frame):
+        """Blocking equivalent of `model(frame)` for one stream."""
+        return self.submit(frame).result()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._requests.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.max_latency_s
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is _STOP:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        frames = [frame for frame, _ in batch]
+        try:
+            results = self.model(frames, conf=self.conf_thresh, iou=self.iou_thresh, verbose=False)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.frames += len(frames)
+        for (_, future), result in zip(batch, results):
+            future.set_result([result])
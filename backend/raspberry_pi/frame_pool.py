@@ -0,0 +1,147 @@
+import abc
+import queue
+
+import cv2
+import numpy as np
+
+
+class FramePool:
+    """
+    Fixed set of preallocated frame buffers shared by the capture loop.
+
+    `acquire` hands out a free buffer and blocks while all of them are in use, which
+    also bounds the number of frames in flight. Every acquired buffer must be given
+    back with `release` once the last stage is done with it.
+
+    Parameters:
+        shape (tuple): Frame shape, e.g. (height, width, 3).
+        size (int): Number of buffers.
+        dtype: Buffer element type.
+    """
+
+    def __init__(self, shape, size=8, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.size = size
+        self._free = queue.Queue()
+        for _ in range(size):
+            self._free.put(np.empty(self.shape, dtype=dtype))
+
+    def acquire(self, timeout=None):
+        return self._free.get(timeout=timeout)
+
+    def release(self, buffer):
+        self._free.put(buffer)
+
+    @property
+    def available(self):
+        return self._free.qsize()
+
+
+class CaptureSource(abc.ABC):
+    """
+    Frame source that reads into pooled buffers instead of allocating a frame per read.
+
+    Frames are passed downstream by reference; whoever consumes a frame last must call
+    `release(frame)` to return its buffer to the pool.
+    """
+
+    pool = None
+
+    @abc.abstractmethod
+    def read(self):
+        """Return the next frame in a pooled buffer, or None at the end of the stream."""
+        raise NotImplementedError
+
+    def release(self, frame):
+        self.pool.release(frame)
+
+    def frames(self):
+        while True:
+            frame = self.read()
+            if frame is None:
+                return
+            yield frame
+
+    def close(self):
+        pass
+
+
+class OpenCVSource(CaptureSource):
+    """
+    Video file or camera read with `cv2.VideoCapture`, decoding straight into pool buffers.
+
+    Parameters:
+        source (str or int): Video path or camera index.
+        pool_size (int): Number of frame buffers.
+    """
+
+    def __init__(self, source, pool_size=8):
+        self.cap = cv2.VideoCapture(source)
+        self.pool_size = pool_size
+        width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        # Some cameras only report their size once the first frame is read
+        self.pool = FramePool((height, width, 3), pool_size) if width and height else None
+
+    def read(self):
+        if self.pool is None:
+            ret, frame = self.cap.read()
+            if not ret:
+                return None
+            self.pool = FramePool(frame.shape, self.pool_size)
+            buffer = self.pool.acquire()
+            np.copyto(buffer, frame)
+            return buffer
+
+        buffer = self.pool.acquire()
+        ret, frame = self.cap.read(buffer)
+        if not ret:
+            self.pool.release(buffer)
+            return None
+        if frame is not buffer:
+            # The decoder could not write in place (e.g. a different frame layout)
+            if frame.shape != buffer.shape:
+                self.pool.release(buffer)
+                raise Exception(f"Frame size changed from {buffer.shape} to {frame.shape}")
+            np.copyto(buffer, frame)
+        return buffer
+
+    def close(self):
+        self.cap.release()
+
+
+class PicameraSource(CaptureSource):
+    """
+    Picamera2 source copying each capture from the camera's mapped buffer into the pool.
+
+    `read_into` copies into a buffer the caller owns instead (e.g. a shared-memory
+    slot); callers that only use it can pass pool_size=0.
+
+    Parameters:
+        size (tuple): Capture (width, height).
+        pool_size (int): Number of frame buffers.
+    """
+
+    def __init__(self, size=(640, 480), pool_size=8):
+        from picamera2 import MappedArray, Picamera2
+
+        self._mapped_array = MappedArray
+        self.picam = Picamera2()
+        config = self.picam.create_preview_configuration(main={"size": size, "format": "RGB888"})
+        self.picam.configure(config)
+        self.picam.start()
+        self.pool = FramePool((size[1], size[0], 3), pool_size)
+
+    def read(self):
+        return self.read_into(self.pool.acquire())
+
+    def read_into(self, buffer):
+        """Copy the next capture into `buffer` and return it."""
+        with self.picam.captured_request() as request:
+            with self._mapped_array(request, "main") as mapped:
+                # Rows can be padded past the frame width
+                np.copyto(buffer, mapped.array[:, :buffer.shape[1], :3])
+        return buffer
+
+    def close(self):
+        self.picam.close()
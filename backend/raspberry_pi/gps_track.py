@@ -0,0 +1,139 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1)
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def to_seconds(timestamp):
+    """Convert a datetime or ISO timestamp string to seconds since the epoch (naive, no timezone)."""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return (timestamp - EPOCH).total_seconds()
+
+
+def format_time(seconds):
+    """Format seconds since the epoch the way the dashboard expects."""
+    return (EPOCH + timedelta(seconds=float(seconds))).strftime(TIME_FORMAT)
+
+
+class GpsTrack:
+    """
+    Time-indexed GPS track with linear interpolation between fixes.
+
+    Fixes are kept in sorted float64 arrays (seconds since the epoch, latitude,
+    longitude) so a position lookup is a binary search plus an interpolation.
+    Queries before the first or after the last fix clamp to that fix instead of
+    failing. Fixes from a live receiver can be appended while other threads query.
+
+    Parameters:
+        capacity (int): Initial number of fixes the arrays can hold; grows as needed.
+    """
+
+    def __init__(self, capacity=1024):
+        self.times = np.empty(capacity, dtype=np.float64)
+        self.lats = np.empty(capacity, dtype=np.float64)
+        self.lons = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_arrays(cls, times, lats, lons):
+        times = np.asarray(times, dtype=np.float64)
+        order = np.argsort(times, kind="stable")
+        track = cls(capacity=max(len(times), 1))
+        track.size = len(times)
+        track.times[:track.size] = times[order]
+        track.lats[:track.size] = np.asarray(lats, dtype=np.float64)[order]
+        track.lons[:track.size] = np.asarray(lons, dtype=np.float64)[order]
+        return track
+
+    @classmethod
+    def from_json(cls, path):
+        """Load a GPS log shaped like demo1.json: a list of {timestamp, latitude, longitude}."""
+        with open(path) as f:
+            fixes = json.load(f)
+        return cls.from_arrays([to_seconds(fix["timestamp"]) for fix in fixes],
+                               [fix["latitude"] for fix in fixes],
+                               [fix["longitude"] for fix in fixes])
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def start(self):
+        return self.times[0] if self.size else None
+
+    @property
+    def end(self):
+        return self.times[self.size - 1] if self.size else None
+
+    def replay_offset(self, now, max_lag_s=60.0):
+        """
+        Seconds to add to wall-clock time `now` to locate live frames on this track.
+
+        A track fed live by a receiver covers the current time (give or take
+        `max_lag_s`) and is used as is (0). A recorded or mock track is replayed
+        from its start, with `now` (the first frame) mapped to its first fix.
+        """
+        if not self.size or self.start - max_lag_s <= now <= self.end + max_lag_s:
+            return 0.0
+        return self.start - now
+
+    def append(self, t, lat, lon):
+        """Add a live fix. Fixes older than the last one are ignored."""
+        with self._lock:
+            if self.size and t <= self.times[self.size - 1]:
+                return False
+            if self.size == len(self.times):
+                self._grow()
+            self.times[self.size] = t
+            self.lats[self.size] = lat
+            self.lons[self.size] = lon
+            self.size += 1
+            return True
+
+    def locate(self, t):
+        """Return the interpolated (lat, lon) at time `t` (seconds since the epoch)."""
+        n = self.size
+        if n == 0:
+            raise ValueError("GPS track has no fixes")
+        times = self.times
+        i = int(np.searchsorted(times[:n], t, side="right"))
+        if i == 0:
+            return self.lats[0], self.lons[0]
+        if i == n:
+            return self.lats[n - 1], self.lons[n - 1]
+        t0, t1 = times[i - 1], times[i]
+        w = (t - t0) / (t1 - t0)
+        return (self.lats[i - 1] + w * (self.lats[i] - self.lats[i - 1]),
+                self.lons[i - 1] + w * (self.lons[i] - self.lons[i - 1]))
+
+    def locate_many(self, ts, out_lats=None, out_lons=None):
+        """
+        Interpolate positions for an array of times in one vectorized pass.
+
+        Pass preallocated `out_lats`/`out_lons` to reuse result buffers across calls.
+        """
+        n = self.size
+        if n == 0:
+            raise ValueError("GPS track has no fixes")
+        ts = np.asarray(ts, dtype=np.float64)
+        if out_lats is None:
+            out_lats = np.empty_like(ts)
+        if out_lons is None:
+            out_lons = np.empty_like(ts)
+        # np.interp does the binary search and clamps to the first/last fix
+        np.copyto(out_lats, np.interp(ts, self.times[:n], self.lats[:n]))
+        np.copyto(out_lons, np.interp(ts, self.times[:n], self.lons[:n]))
+        return out_lats, out_lons
+
+    def _grow(self):
+        capacity = len(self.times) * 2
+        for name in ("times", "lats", "lons"):
+            grown = np.empty(capacity, dtype=np.float64)
+            grown[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, grown)
@@ -1,14 +1,19 @@
+import os
+from datetime import datetime
+
 import cv2
 
 
-def capture_image():
+def capture_image(image_path=None, capture_dir="captures"):
     cap = cv2.VideoCapture(0)
     ret, frame = cap.read()
-    if ret:
-        image_path = ""
-        cv2.imwrite(image_path, frame)s
-        cap.release()
-        return image_path
-    else:
-        cap.release()
+    cap.release()
+    if not ret:
         raise Exception("Failed to capture image")
+
+    if image_path is None:
+        os.makedirs(capture_dir, exist_ok=True)
+        image_path = os.path.join(capture_dir, f"capture_{datetime.now():%Y%m%d_%H%M%S_%f}.jpg")
+    if not cv2.imwrite(image_path, frame):
+        raise Exception(f"Failed to save image to {image_path}")
+    return image_path
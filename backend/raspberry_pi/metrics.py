@@ -0,0 +1,169 @@
+import collections
+import json
+import math
+import threading
+import time
+
+# Log-spaced latency buckets: 10 per decade from 10 us to 100 s
+_MIN_S = 1e-5
+_BUCKETS_PER_DECADE = 10
+_BUCKETS = 7 * _BUCKETS_PER_DECADE + 2
+
+
+class LatencyHistogram:
+    """
+    Fixed log-bucket latency histogram: constant memory and an O(1) `record`.
+
+    Quantiles are read from the bucket counts, so they are accurate to the bucket
+    width (about 26%), which is plenty to see where the frame time goes.
+    """
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        if seconds <= _MIN_S:
+            index = 0
+        else:
+            index = min(int(math.log10(seconds / _MIN_S) * _BUCKETS_PER_DECADE) + 1, _BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Approximate q-quantile in seconds (geometric middle of its bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                if index == 0:
+                    return min(_MIN_S, self.max)
+                return min(_MIN_S * 10 ** ((index - 0.5) / _BUCKETS_PER_DECADE), self.max)
+        return self.max
+
+    def summary(self):
+        ms = 1000.0
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * ms if self.count else 0.0,
+            "p50_ms": self.quantile(0.50) * ms,
+            "p95_ms": self.quantile(0.95) * ms,
+            "p99_ms": self.quantile(0.99) * ms,
+            "max_ms": self.max * ms,
+        }
+
+
+class StageMetrics:
+    """
+    Per-stage latency histograms and rolling FPS for the frame loop.
+
+    Stages record their durations with `record` or by being wrapped with `timed`;
+    the last stage calls `frame_done` once per frame, which updates the rolling FPS
+    and, every `export_interval` seconds, appends a snapshot to `export_path` as a
+    JSON line. Each stage is expected to be recorded from one thread at a time.
+
+    Call `start` when the first frame is about to be decoded, so model loading and
+    warmup are not counted. `steady_fps` also leaves out the time until the first
+    frame is done (pipeline fill, first inference).
+
+    Parameters:
+        export_path (str): JSON-lines file for the periodic snapshots. None disables it.
+        export_interval (float): Seconds between snapshots.
+        fps_window (float): Seconds of frames the rolling FPS is computed over.
+    """
+
+    def __init__(self, export_path=None, export_interval=10.0, fps_window=5.0):
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.fps_window = fps_window
+
+        self.frames = 0
+        self.stages = {}
+        self._lock = threading.Lock()
+        self._done = collections.deque()
+        self._first_done = None
+        self.start()
+
+    def start(self):
+        """(Re)start the clock the elapsed time and mean FPS are measured from."""
+        self._start = time.perf_counter()
+        self._next_export = self._start + self.export_interval
+
+    def record(self, stage, seconds):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, LatencyHistogram())
+        histogram.record(seconds)
+
+    def timed(self, stage, fn):
+        """Wrap `fn` so every call is recorded under `stage`."""
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return wrapper
+
+    def frame_done(self):
+        now = time.perf_counter()
+        self.frames += 1
+        if self._first_done is None:
+            self._first_done = now
+        self._done.append(now)
+        while now - self._done[0] > self.fps_window:
+            self._done.popleft()
+        if self.export_path is not None and now >= self._next_export:
+            self._next_export = now + self.export_interval
+            self.export()
+
+    @property
+    def fps(self):
+        """Frames per second over the last `fps_window` seconds."""
+        if len(self._done) < 2:
+            return 0.0
+        return (len(self._done) - 1) / max(self._done[-1] - self._done[0], 1e-9)
+
+    @property
+    def steady_fps(self):
+        """Frames per second from the first finished frame on."""
+        if self.frames < 2:
+            return 0.0
+        return (self.frames - 1) / max(self._done[-1] - self._first_done, 1e-9)
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self._start
+        return {
+            "time": time.time(),
+            "elapsed_s": elapsed,
+            "frames": self.frames,
+            "fps": self.fps,
+            "mean_fps": self.frames / elapsed if elapsed > 0 else 0.0,
+            "steady_fps": self.steady_fps,
+            "stages": {name: h.summary() for name, h in list(self.stages.items())},
+        }
+
+    def export(self):
+        with open(self.export_path, "a") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+    def report(self):
+        """Human-readable table of the stage latencies."""
+        snapshot = self.snapshot()
+        lines = [f"{snapshot['frames']} frames in {snapshot['elapsed_s']:.1f}s "
+                 f"({snapshot['mean_fps']:.1f} FPS, steady {snapshot['steady_fps']:.1f} FPS, "
+                 f"last {self.fps_window:.0f}s {snapshot['fps']:.1f} FPS)",
+                 f"{'stage':<10} {'count':>7} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)"]
+        for name, s in snapshot["stages"].items():
+            lines.append(f"{name:<10} {s['count']:>7} {s['mean_ms']:>8.2f} {s['p50_ms']:>8.2f} "
+                         f"{s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f} {s['max_ms']:>8.2f}")
+        return "\n".join(lines)
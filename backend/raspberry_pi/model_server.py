@@ -0,0 +1,134 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from backends import DEFAULT_WEIGHTS, IMAGE_SIZE, load_model
+
+CLASSIFIER_WEIGHTS = "road_condition_model.pth"
+CLASSIFIER_SIZE = 224
+
+# Loaded models, shared by everything in the process
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+class DetectorServer:
+    """
+    Long-lived YOLO detector, loaded and warmed up once per process.
+
+    `predict` accepts one image or a list of images (BGR arrays or paths) and runs
+    them as one batched model call. Calls are serialized so threads can share it.
+    The server is callable like the YOLO model it wraps, so it can be used wherever
+    a model is expected (e.g. BatchInferenceEngine).
+
+    Parameters:
+        weights (str): Path to the YOLO PyTorch weights.
+        backend (str): Inference backend: "pytorch", "onnx", "openvino" or "ncnn".
+        int8 (bool): Use int8 quantized weights.
+        data (str): Dataset data.yaml used to calibrate the int8 export.
+        imgsz (int): Input size every call runs at. Images already letterboxed to
+            it (see RoiPreprocessor) are then not resized again.
+    """
+
+    def __init__(self, weights=DEFAULT_WEIGHTS, backend="pytorch", int8=False, data=None, imgsz=IMAGE_SIZE):
+        self.weights = weights
+        self.backend = backend
+        self.imgsz = imgsz
+        self.model = load_model(weights, backend, int8, data, imgsz)
+        self._lock = threading.Lock()
+
+    def warmup(self, runs=2):
+        """Run dummy frames so lazy initialization and allocations happen before real frames."""
+        dummy = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        for _ in range(runs):
+            self.predict(dummy)
+        return self
+
+    def predict(self, images, conf=0.25, iou=0.5, **kwargs):
+        """Return the YOLO results for one image or a list of images."""
+        kwargs.setdefault("verbose", False)
+        kwargs.setdefault("imgsz", self.imgsz)
+        with self._lock:
+            return self.model(images, conf=conf, iou=iou, **kwargs)
+
+    __call__ = predict
+
+
+class ClassifierServer:
+    """
+    Long-lived road-condition classifier, loaded and warmed up once per process.
+
+    `predict` takes a list of images (paths, PIL images or BGR arrays), stacks them
+    into one batch and returns the predicted class index of each.
+
+    Parameters:
+        model_path (str): Path to the pickled PyTorch classifier.
+        size (int): Side of the square classifier input.
+    """
+
+    def __init__(self, model_path=CLASSIFIER_WEIGHTS, size=CLASSIFIER_SIZE):
+        import torch
+        from torchvision import transforms
+
+        self._torch = torch
+        self.model_path = model_path
+        self.size = size
+        self.model = torch.load(model_path)
+        self.model.eval()
+        self.transform = transforms.Compose(
+            [transforms.Resize((size, size)), transforms.ToTensor()]
+        )
+        self._lock = threading.Lock()
+
+    def warmup(self, runs=2):
+        dummy = self._torch.zeros((1, 3, self.size, self.size))
+        with self._lock, self._torch.inference_mode():
+            for _ in range(runs):
+                self.model(dummy)
+        return self
+
+    def predict(self, images):
+        """Return the class index predicted for each image."""
+        batch = self._torch.stack([self.transform(self._to_pil(image)) for image in images])
+        with self._lock, self._torch.inference_mode():
+            result = self.model(batch)
+        return self._torch.argmax(result, dim=1).tolist()
+
+    __call__ = predict
+
+    @staticmethod
+    def _to_pil(image):
+        from PIL import Image
+
+        if isinstance(image, str):
+            return Image.open(image).convert("RGB")
+        if isinstance(image, np.ndarray):
+            return Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        return image.convert("RGB")
+
+
+def _get(key, factory, warmup):
+    with _servers_lock:
+        server = _servers.get(key)
+        if server is None:
+            server = factory()
+            if warmup:
+                server.warmup()
+            _servers[key] = server
+        return server
+
+
+def get_detector(weights=DEFAULT_WEIGHTS, backend="pytorch", int8=False, data=None, warmup=True, imgsz=IMAGE_SIZE):
+    """Return the process-wide detector for these weights, backend and input size, loading it on first use."""
+    imgsz = imgsz or IMAGE_SIZE
+    key = ("detector", os.path.abspath(weights), backend, int8, imgsz)
+    return _get(key, lambda: DetectorServer(weights, backend, int8, data, imgsz), warmup)
+
+
+def get_classifier(model_path=CLASSIFIER_WEIGHTS, warmup=True):
+    """Return the process-wide classifier for these weights, loading it on first use."""
+    key = ("classifier", os.path.abspath(model_path))
+    return _get(key, lambda: ClassifierServer(model_path), warmup)
+
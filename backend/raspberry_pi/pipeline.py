@@ -0,0 +1,133 @@
+import queue
+import threading
+
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+_END = object()
+
+
+class Pipeline:
+    """
+    Staged frame pipeline with bounded queues between the stages.
+
+    The source runs in its own thread and feeds the first stage. Every stage except
+    the last one runs in its own worker thread, so decoding, inference and encoding
+    overlap. The last stage runs on the calling thread, which keeps OpenCV GUI calls
+    (`imshow`/`waitKey`) on the main thread.
+
+    A stage is a callable that takes an item and returns the item for the next stage,
+    or None to drop it. Any stage may call `stop()` to end the run early. Items that
+    never reach the end of the pipeline (dropped by the source, or drained after a
+    stop or an error) are passed to `on_discard`, e.g. to release pooled frames.
+
+    Parameters:
+        queue_size (int): Capacity of each queue between stages.
+        drop_policy (str): What the source does when the first queue is full:
+            "block" waits for room (files), "drop_oldest" discards the oldest queued
+            frame so live cameras always process the freshest one.
+        on_discard (callable): Called with every item that is dropped or drained.
+    """
+
+    def __init__(self, queue_size=4, drop_policy=BLOCK, on_discard=None):
+        if drop_policy not in (BLOCK, DROP_OLDEST):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.on_discard = on_discard
+        self.stages = []
+        self.dropped = 0
+        self._stop = threading.Event()
+        self._error = None
+
+    def add_stage(self, name, fn):
+        self.stages.append((name, fn))
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def run(self, source):
+        """Feed every item of `source` through the stages and wait for the end."""
+        if not self.stages:
+            raise ValueError("Pipeline has no stages")
+
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        threads = [threading.Thread(target=self._feed, args=(source, queues[0]),
+                                    name="source", daemon=True)]
+        for i, (name, fn) in enumerate(self.stages[:-1]):
+            threads.append(threading.Thread(target=self._work, args=(fn, queues[i], queues[i + 1]),
+                                            name=name, daemon=True))
+        for t in threads:
+            t.start()
+
+        self._work(self.stages[-1][1], queues[-1], None)
+
+        for t in threads:
+            t.join()
+        if self._error is not None:
+            raise self._error
+
+    def _feed(self, source, out_q):
+        try:
+            for item in source:
+                if self._stop.is_set():
+                    self._discard(item)
+                    break
+                self._put(out_q, item)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            out_q.put(_END)
+
+    def _work(self, fn, in_q, out_q):
+        while True:
+            item = in_q.get()
+            if item is _END:
+                break
+            # Once stopped, drain the queue without processing so upstream can finish
+            if self._stop.is_set():
+                self._discard(item)
+                continue
+            try:
+                result = fn(item)
+            except Exception as e:
+                self._fail(e)
+                self._discard(item)
+                continue
+            if out_q is None:
+                continue
+            if result is None:
+                self._discard(item)
+            else:
+                out_q.put(result)
+        if out_q is not None:
+            out_q.put(_END)
+
+    def _put(self, q, item):
+        if self.drop_policy == BLOCK:
+            q.put(item)
+            return
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._discard(q.get_nowait())
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _discard(self, item):
+        if self.on_discard is not None:
+            self.on_discard(item)
+
+    def _fail(self, error):
+        if self._error is None:
+            self._error = error
+        self._stop.set()
@@ -1,46 +1,172 @@
-from ultralytics import YOLO
 import cv2
-import requests
+import json
+import os
 from datetime import datetime
-import numpy as np
-from datetime import timedelta
+import threading
+import time
+from aggregator import SegmentAggregator
+from backends import DEFAULT_WEIGHTS
+from change_gate import ChangeGate
+from clip_recorder import ClipRecorder
+from defect_tracker import TRACK_LOW_CONF, TRACK_SPACING_M, DefectTracker
+from detection_cache import CACHE_CONF, CACHE_IOU, DetectionRecorder, cache_path
+from engine import BatchInferenceEngine
+from frame_pool import OpenCVSource
+from gps_track import GpsTrack, format_time, to_seconds
+from metrics import StageMetrics
+from model_server import get_detector
+from pipeline import Pipeline, BLOCK, DROP_OLDEST
+from roi import RoiPreprocessor
+from scheduler import InferenceScheduler
+from scoring import boxes_to_numpy, filter_detections, score_detections
+from shm_transport import PICAMERA, SharedMemoryRunner
+from uploader import Uploader
 
 DASHBOARD_URL = "http://127.0.0.1:8050/add_point"
 
-# Mock GPS locations and timestamps
+# Mock GPS track and timestamps
 start_lat, start_lon = 37.453277, 126.657042
 end_lat, end_lon = 37.453638, 126.658605
 start_time = datetime(2024, 11, 23, 16, 30, 3)
 end_time = datetime(2024, 11, 23, 16, 31, 4)
-total_duration = (end_time - start_time).total_seconds()
-fps = 30
-num_frames = int(total_duration * fps)
+mock_track = GpsTrack.from_arrays([to_seconds(start_time), to_seconds(end_time)],
+                                  [start_lat, end_lat], [start_lon, end_lon])
 
-latitudes = np.linspace(start_lat, end_lat, num_frames)
-longitudes = np.linspace(start_lon, end_lon, num_frames)
-timestamps = [start_time + timedelta(seconds=i / fps) for i in range(num_frames)]
+def get_mock_location(frame_index, fps=30):
+    t = mock_track.start + frame_index / fps
+    lat, lng = mock_track.locate(t)
+    return lat, lng, format_time(t)
 
-def get_mock_location(frame_index):
-    return latitudes[frame_index], longitudes[frame_index], timestamps[frame_index].strftime("%Y-%m-%d %H:%M:%S")
-
-def process_video(video_path, output_dir="output.avi", conf_thresh=0.25, iou_thresh=0.5, score_thresh=0.7, save=False):
+def process_video(video_path, output_dir="output.avi", conf_thresh=0.25, iou_thresh=0.5, score_thresh=0.7, save=False,
+                  queue_size=4, drop_policy=None, min_spacing_m=2.0, max_interval_s=1.0,
+                  class_weights=None, headless=False, preview_fps=None,
+                  weights=DEFAULT_WEIGHTS, backend="pytorch", int8=False, calib_data=None, engine=None,
+                  gps_track=None, roi=None, input_size=640, segment_m=10.0,
+                  change_thresh=4.0, pool_size=8, archive=None, clip_dir=None, pre_roll_s=3.0, post_roll_s=3.0,
+                  defects_path=None, cache_dir=None, metrics_path=None, metrics_interval=10.0,
+                  dashboard_url=DASHBOARD_URL, journal_path="upload_journal.jsonl", max_frames=None):
     """
     Process a video file using a YOLO model to perform object detection and save results.
 
+    The work is split into pipelined stages (decode, infer, score, annotate, write,
+    upload/display) connected by bounded queues, so decoding and encoding overlap
+    with inference. Inference only runs on frames where the vehicle has moved
+    `min_spacing_m` or `max_interval_s` has passed; other frames reuse the last result.
+
+    Frames are only annotated when a sink needs the pixels: the video writer when
+    `save` is set, the clip recorder when `clip_dir` is set, or the preview window. In `headless` mode there is no preview, so
+    without `save` the annotate, write and display work is skipped entirely.
+
     Parameters:
-        video_path (str): Path to the input video file.
+        video_path (str or int): Path to the input video file, or a camera index.
         output_dir (str): Directory to save processed video.
         conf_thresh (float): Confidence threshold for detection.
         iou_thresh (float): IoU threshold for detection.
         score_thresh (float): Score threshold to trigger warnings.
-        save (bool): Whether to save the processed video.
+        save (bool): Whether to save the whole processed video. `clip_dir` keeps only
+            the footage around low-score events at a fraction of the cost.
+        queue_size (int): Capacity of the queues between stages.
+        drop_policy (str): "block" or "drop_oldest". Defaults to "drop_oldest" for
+            live cameras and "block" for files.
+        min_spacing_m (float): Metres travelled between inferred frames. 0 infers every frame.
+        max_interval_s (float): Maximum seconds between inferred frames while moving.
+        class_weights (dict): Optional weight per class ID for the damaged area.
+        headless (bool): Run without a preview window or GUI event loop.
+        preview_fps (float): Limit the preview window to this many frames per second.
+            None previews every frame.
+        weights (str): Path to the YOLO PyTorch weights.
+        backend (str): Inference backend: "pytorch", "onnx", "openvino" or "ncnn".
+            The weights are exported on first use.
+        int8 (bool): Use int8 quantized weights (onnx and openvino only).
+        calib_data (str): Dataset data.yaml used to calibrate the int8 export.
+        engine (BatchInferenceEngine): Shared engine to run inference on instead of
+            loading a model for this stream. The engine's thresholds apply.
+        gps_track (GpsTrack): Track to position frames on, e.g. loaded with
+            GpsTrack.from_json or fed live by a receiver. Defaults to the mock track.
+            Video frames are placed by their timestamp from the track start; camera
+            frames by the wall clock.
+        roi (tuple or RoiPreprocessor): Road region as (x1, y1, x2, y2) fractions of
+            the frame, or a preprocessor loaded with RoiPreprocessor.from_file. Only
+            the region is sent to the model, and the score is relative to its area.
+        input_size (int): Longest side of the letterboxed model input. The model runs
+            at this size; exported backends get a separate export per size.
+        segment_m (float): Report one aggregated record per this many metres of road
+            (split where the score crosses `score_thresh`, so damaged stretches get
+            their own records). None reports every frame.
+        change_thresh (float): Mean grayscale thumbnail difference below which a frame
+            is considered unchanged and reuses the last result. None disables the gate.
+        pool_size (int): Number of preallocated frame buffers. Frames are decoded into
+            them and released by the last stage, which also caps the frames in flight.
+        archive (FrameArchiver): Started archiver that samples inferred frames to disk
+            as JPEGs in the background.
+        clip_dir (str): Record annotated clips around frames scoring below
+            `score_thresh` into this directory, with an index.jsonl linking each clip
+            to its GPS position and score. None disables the recorder.
+        pre_roll_s (float): Seconds of video recorded before a clip's first low frame.
+        post_roll_s (float): Seconds of video recorded after a clip's last low frame.
+        defects_path (str): Track detections across frames and append one event per
+            defect (ID, class, peak confidence, best frame, GPS position) to this
+            JSON-lines file. None disables the tracker. The tracker needs nearly
+            consecutive frames, so tracking caps `min_spacing_m` at TRACK_SPACING_M,
+            disables the change gate and lets the model keep detections down to
+            TRACK_LOW_CONF for the tracker's second matching pass.
+        cache_dir (str): Save the raw per-frame detections of a video file to a cache
+            in this directory (keyed by video and model hash and by the scheduler,
+            change gate and `max_frames` settings), for re-scoring with other
+            thresholds via detection_cache.py without running the model again.
+            The model then runs with loose thresholds and `conf_thresh`/`iou_thresh`
+            are applied afterwards. Runs that stop early are not saved. Ignored for
+            cameras, stream URLs and a shared engine.
+        metrics_path (str): Append a snapshot of the per-stage latency percentiles and
+            the rolling FPS to this JSON-lines file every `metrics_interval` seconds.
+            The timings are always collected and printed at the end.
+        metrics_interval (float): Seconds between metrics snapshots.
+        dashboard_url (str): Endpoint the reports are uploaded to. None discards them.
+        journal_path (str): File the uploader spools reports to while the dashboard
+            is unreachable. Must differ between concurrent streams.
+        max_frames (int): Stop after this many frames. None processes the whole video.
+
+    Returns:
+        dict: Final metrics snapshot (frames, FPS and latency percentiles per stage).
     """
-    # Load the YOLO model
-    model = YOLO("backend/raspberry_pi/weights/best.pt")
-    
-    # Initialize video capture
-    cap = cv2.VideoCapture(video_path)
+    metrics = StageMetrics(metrics_path, export_interval=metrics_interval)
+
+    # Caching keeps detections below the thresholds, which are then applied when scoring
+    caching = cache_dir is not None and engine is None and isinstance(video_path, str) and os.path.isfile(video_path)
+    infer_conf = min(conf_thresh, CACHE_CONF) if caching else conf_thresh
+    infer_iou = max(iou_thresh, CACHE_IOU) if caching else iou_thresh
+
+    # The tracker matches boxes between frames: it needs them close together, and
+    # the weak detections as well for its second pass
+    tracking = defects_path is not None
+    if tracking:
+        min_spacing_m = min(min_spacing_m, TRACK_SPACING_M)
+        change_thresh = None
+        if engine is None:
+            infer_conf = min(infer_conf, TRACK_LOW_CONF)
+    loose = infer_conf < conf_thresh or infer_iou > iou_thresh
+
+    # Frames are letterboxed to the input size here, and the model runs at that size
+    preprocessor = roi if isinstance(roi, RoiPreprocessor) else RoiPreprocessor(roi, input_size)
+
+    # Get the warmed-up YOLO model, unless a shared engine batches inference across streams
+    if engine is None:
+        detector = get_detector(weights, backend, int8, calib_data, imgsz=preprocessor.input_size)
+
+        def predict(frame):
+            return detector(frame, conf=infer_conf, iou=infer_iou)
+    else:
+        predict = engine.infer
+    predict = metrics.timed("model", predict)
+
+    # Initialize video capture, decoding into a fixed pool of frame buffers
+    source = OpenCVSource(video_path, pool_size=pool_size)
+    cap = source.cap
     
+    if not cap.isOpened():
+        print(f"Error: Could not open video {video_path}")
+        return
+
     # Save the video
     fps = cap.get(cv2.CAP_PROP_FPS)
     if save:
@@ -48,79 +174,337 @@ def process_video(video_path, output_dir="output.avi", conf_thresh=0.25, iou_thr
         width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))                                                 
         out = cv2.VideoWriter(output_dir, fourcc, fps, (width, height))
-    
-    if not cap.isOpened():
-        print(f"Error: Could not open video {video_path}")
-        return
-    
-    frame_num = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("End of video or failed to capture frame.")
-            break
-        
-        # Get mock location and timestamp
-        lat, lng, timestamp = get_mock_location(frame_num)
-        frame_num += 1
-
-        # Run inference on the frame
-        results = model(frame, conf=conf_thresh, iou=iou_thresh)
-        
-        # Initialize total boxes area
-        boxes_area = 0
-        area = frame.shape[0] * frame.shape[1]
-        
-        for result in results:
-            boxes = result.boxes  # Use the boxes property
-            for box in boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())  # Bounding box coordinates
-                w = x2 - x1
-                h = y2 - y1
-                boxes_area += w * h
-                conf = box.conf[0].item()  # Confidence score
-                cls = int(box.cls[0].item())  # Class ID
-
-                # Draw the bounding box and label
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(frame, f"Class: {cls}, Conf: {conf:.2f}",
-                            (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-        
-        # Calculate and display the score
-        score = 1 - (boxes_area / area)
-        if score < score_thresh:
+
+    # Clips are encoded in a separate, spawned process. It and the uploader are only
+    # started inside the try below, so its finally stops them whatever fails in setup
+    recorder = None
+    if clip_dir is not None:
+        recorder = ClipRecorder(clip_dir, fps=fps, pre_roll_s=pre_roll_s, post_roll_s=post_roll_s,
+                                score_thresh=score_thresh)
+
+    # Reports are sent in the background so the frame loop never waits on the network
+    uploader = None
+    if dashboard_url is not None:
+        uploader = Uploader(dashboard_url, journal_path=journal_path, metrics=metrics)
+    report = uploader.submit if uploader is not None else (lambda payload: None)
+
+    live = isinstance(video_path, int)
+    if drop_policy is None:
+        drop_policy = DROP_OLDEST if live else BLOCK
+
+    def release(item):
+        source.release(item["frame"])
+
+    pipeline = Pipeline(queue_size=queue_size, drop_policy=drop_policy, on_discard=release)
+    scheduler = InferenceScheduler(min_spacing_m=min_spacing_m, max_interval_s=max_interval_s)
+    gate = ChangeGate(change_thresh) if change_thresh is not None else None
+    last = {"detections": boxes_to_numpy([]), "score": 1.0, "classes": {}}
+    aggregator = None
+    if segment_m:
+        aggregator = SegmentAggregator(report, segment_m=segment_m, score_thresh=score_thresh)
+    cache = None
+    if caching:
+        # Only the inferred frames are cached, so the settings picking them are part of the key
+        settings = {"min_spacing_m": min_spacing_m, "max_interval_s": max_interval_s,
+                    "change_thresh": change_thresh, "max_frames": max_frames}
+        cache = DetectionRecorder(
+            cache_path(cache_dir, video_path, weights, backend, int8, preprocessor.roi, preprocessor.input_size,
+                       settings),
+            dict(settings, video=str(video_path), weights=weights, backend=backend, int8=int8,
+                 roi=preprocessor.roi, input_size=preprocessor.input_size))
+    tracker = None
+    if defects_path is not None:
+        defects_file = open(defects_path, "a")
+
+        def log_defect(event):
+            defects_file.write(json.dumps(event) + "\n")
+
+        tracker = DefectTracker(log_defect, high_thresh=conf_thresh)
+
+    if gps_track is None:
+        gps_track = mock_track
+
+    def decode():
+        # Model loading, export and warmup are done; time the frame loop only
+        metrics.start()
+        frame_num = 0
+        offset = None
+        while max_frames is None or frame_num < max_frames:
+            start = time.perf_counter()
+            frame = source.read()
+            if frame is None:
+                print("End of video or failed to capture frame.")
+                break
+
+            # Position the frame on the GPS track by its timestamp
+            if live:
+                t = to_seconds(datetime.now())
+                if offset is None:
+                    offset = gps_track.replay_offset(t)
+                t += offset
+            else:
+                t = gps_track.start + cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            lat, lng = gps_track.locate(t)
+            metrics.record("decode", time.perf_counter() - start)
+            yield {"index": frame_num, "frame": frame, "lat": lat, "lng": lng, "timestamp": format_time(t), "t": t}
+            frame_num += 1
+
+    def infer(item):
+        # Skip frames covering road we have already looked at
+        item["inferred"] = scheduler.should_infer(item["lat"], item["lng"], item["t"])
+        # ...and frames where the camera sees the same scene as last time
+        if item["inferred"] and gate is not None:
+            item["inferred"] = gate.should_infer(item["frame"])
+        if not item["inferred"]:
+            return item
+
+        # Run inference on the road region, letterboxed to the model input size
+        image, item["letterbox"] = preprocessor.prepare(item["frame"])
+        item["results"] = predict(image)
+        return item
+
+    def score(item):
+        if not item["inferred"]:
+            item["detections"] = last["detections"]
+            item["score"] = last["score"]
+            item["classes"] = last["classes"]
+            return item
+
+        # Score the union of the damaged area from all boxes at once, relative to the ROI
+        lb = item["letterbox"]
+        detections = preprocessor.to_roi(boxes_to_numpy(item["results"]), lb)
+        if cache is not None:
+            cache.add(item["index"], item["t"], item["lat"], item["lng"], detections, lb.width, lb.height)
+        raw = detections
+        if loose:
+            detections = filter_detections(raw, conf_thresh, iou_thresh)
+        if tracker is not None:
+            weak = filter_detections(raw, tracker.low_thresh, iou_thresh) if loose else detections
+            item["tracked"] = preprocessor.to_frame(weak, lb)
+        item["score"], item["classes"] = score_detections(detections, lb.width, lb.height, class_weights)
+        detections = preprocessor.to_frame(detections, lb)
+        item["detections"] = detections
+        last["detections"] = detections
+        last["score"] = item["score"]
+        last["classes"] = item["classes"]
+        return item
+
+    next_preview = 0.0
+
+    def annotate(item):
+        nonlocal next_preview
+        # Only draw when a sink is going to use the pixels
+        item["preview"] = not headless and (not preview_fps or item["t"] >= next_preview)
+        if item["preview"] and preview_fps:
+            next_preview = item["t"] + 1.0 / preview_fps
+        if not (save or item["preview"] or recorder is not None):
+            return item
+
+        frame = item["frame"]
+        if roi is not None:
+            # Outline the road region the score is computed on
+            x1, y1, x2, y2 = preprocessor.region(frame.shape)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 1)
+        for x1, y1, x2, y2, conf, cls in item["detections"]:
+            x1, y1, x2, y2, cls = int(x1), int(y1), int(x2), int(y2), int(cls)
+            # Draw the bounding box and label
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(frame, f"Class: {cls}, Conf: {conf:.2f}",
+                        (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+        # Display the score
+        if item["score"] < score_thresh:
             cv2.putText(frame, "Warning: Low Score Detected. Road needs to be fixed",
                         (30, 90), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 255), 2)
-        cv2.putText(frame, f"Score: {score:.2f}",
+        cv2.putText(frame, f"Score: {item['score']:.2f}",
                     (30, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 2)
-        cv2.putText(frame, f"Latitude: {lat}",
+        cv2.putText(frame, f"Latitude: {item['lat']}",
                     (30, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        cv2.putText(frame, f"Longitude: {lng}",
+        cv2.putText(frame, f"Longitude: {item['lng']}",
                     (30, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        cv2.putText(frame, f"Timestamp: {timestamp}",
+        cv2.putText(frame, f"Timestamp: {item['timestamp']}",
                     (30, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-        
+        return item
+
+    def write(item):
         # Save the processed frame
-        if save:
-            out.write(frame)
-        
-        # Make payload and send to dashboard
-        payload = {
-            "longitude": lng,
-            "latitude": lat,
-            "timestamp": timestamp,
-            "score": score*100
-        }
-        
-        requests.post(DASHBOARD_URL, json=payload)
-        
-        cv2.imshow("frame", frame)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
-
-    # Release resources
-    cap.release()
+        out.write(item["frame"])
+        return item
+
+    processed = 0
+
+    def sink(item):
+        nonlocal processed
+        processed += 1
+        if aggregator is not None:
+            # Frames that reused an earlier result add nothing new to the segment
+            if item["inferred"]:
+                aggregator.add(item["lat"], item["lng"], item["t"], item["timestamp"], item["score"])
+        else:
+            # Make payload and send to dashboard
+            payload = {
+                "longitude": item["lng"],
+                "latitude": item["lat"],
+                "timestamp": item["timestamp"],
+                "score": item["score"]*100
+            }
+            report(payload)
+
+        if tracker is not None and item["inferred"]:
+            tracker.update(item["tracked"], item["index"], item["lat"], item["lng"], item["timestamp"])
+        if recorder is not None:
+            recorder.add(item["frame"], item["lat"], item["lng"], item["timestamp"], item["score"])
+        if archive is not None and item["inferred"]:
+            archive.submit(item["index"], item["frame"], item["detections"], item["score"])
+
+        if item.get("preview"):
+            start = time.perf_counter()
+            cv2.imshow("frame", item["frame"])
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                pipeline.stop()
+            metrics.record("display", time.perf_counter() - start)
+
+        # Last stage: hand the frame buffer back to the pool
+        release(item)
+        metrics.frame_done()
+
+    # Every stage is timed; "model", "decode", "display" and "upload" are recorded inside them
+    pipeline.add_stage("infer", metrics.timed("infer", infer))
+    pipeline.add_stage("score", metrics.timed("score", score))
+    if save or not headless or recorder is not None:
+        pipeline.add_stage("annotate", metrics.timed("annotate", annotate))
     if save:
-        out.release()
-    cv2.destroyAllWindows()
-    print(f"Processed {frame_num} frames. Saved results in {output_dir}.")
+        pipeline.add_stage("write", metrics.timed("write", write))
+    pipeline.add_stage("sink", metrics.timed("sink", sink))
+    completed = False
+    try:
+        if recorder is not None:
+            recorder.start()
+        if uploader is not None:
+            uploader.start()
+        pipeline.run(decode())
+        completed = not pipeline.stopped
+    finally:
+        # Release resources
+        source.close()
+        if save:
+            out.release()
+        if recorder is not None:
+            recorder.stop()
+        if cache is not None:
+            if completed:
+                cache.save()
+            else:
+                print("Run stopped early; detections not cached.")
+        if tracker is not None:
+            tracker.flush()
+            defects_file.close()
+            print(f"Logged {tracker.defects} tracked defects to {defects_path}.")
+        if not headless:
+            cv2.destroyAllWindows()
+        if aggregator is not None:
+            aggregator.flush()
+            print(f"Reported {aggregator.segments} road segments for {aggregator.frames} scored frames.")
+        if uploader is not None:
+            uploader.stop()
+        if metrics_path is not None:
+            metrics.export()
+    print(f"Inference scheduled on {scheduler.inferred} frames, skipped {scheduler.skipped}.")
+    if gate is not None:
+        print(gate.stats())
+    if pipeline.dropped:
+        print(f"Dropped {pipeline.dropped} frames to keep up with the camera.")
+    print(f"Processed {processed} frames. Saved results in {output_dir}.")
+    print(metrics.report())
+    return metrics.snapshot()
+
+
+def process_streams(sources, conf_thresh=0.25, iou_thresh=0.5, max_latency_s=0.02,
+                    weights=DEFAULT_WEIGHTS, backend="pytorch", int8=False, calib_data=None, **kwargs):
+    """
+    Process several camera streams (e.g. front and rear) with one shared model.
+
+    Every source runs its own headless `process_video` pipeline in a thread; their
+    frames are micro-batched into single model calls by a BatchInferenceEngine.
+
+    Parameters:
+        sources (list): Video paths or camera indices, one per stream.
+        conf_thresh (float): Confidence threshold for detection.
+        iou_thresh (float): IoU threshold for detection.
+        max_latency_s (float): Maximum time a frame waits for a batch to fill.
+        **kwargs: Other `process_video` arguments, applied to every stream.
+    """
+    # Every stream letterboxes to the same input size, which the shared model runs at
+    roi = kwargs.get("roi")
+    input_size = roi.input_size if isinstance(roi, RoiPreprocessor) else kwargs.get("input_size", 640)
+    detector = get_detector(weights, backend, int8, calib_data, imgsz=input_size)
+    engine = BatchInferenceEngine(detector, max_batch=len(sources), max_latency_s=max_latency_s,
+                                  conf_thresh=conf_thresh, iou_thresh=iou_thresh)
+    kwargs["headless"] = True
+
+    with engine:
+        threads = []
+        for i, source in enumerate(sources):
+            stream_kwargs = dict(kwargs, output_dir=f"output_{i}.avi", journal_path=f"upload_journal_{i}.jsonl",
+                                 engine=engine)
+            threads.append(threading.Thread(target=process_video, args=(source,), kwargs=stream_kwargs,
+                                            name=f"stream-{i}"))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+
+def process_video_mp(video_path, workers=3, slots=8, conf_thresh=0.25, iou_thresh=0.5, score_thresh=0.7,
+                     segment_m=10.0, gps_track=None, weights=DEFAULT_WEIGHTS, backend="pytorch", int8=False,
+                     roi=None, input_size=640, class_weights=None):
+    """
+    Headless multi-process variant of `process_video` for multi-core boards.
+
+    A capture process decodes frames into a shared-memory ring, `workers` inference
+    processes score them without copying, and this process only positions, aggregates
+    and uploads the results, so the stages no longer compete for one GIL.
+
+    Parameters:
+        video_path (str or int): Path to the input video file, a camera index, or
+            "picamera" for the Raspberry Pi camera.
+        workers (int): Number of inference processes.
+        slots (int): Number of shared-memory frame slots (frames in flight).
+        Other parameters are as for `process_video`.
+    """
+    if gps_track is None:
+        gps_track = mock_track
+    live = video_path == PICAMERA or isinstance(video_path, int)
+
+    runner = SharedMemoryRunner(video_path, workers=workers, slots=slots, weights=weights, backend=backend,
+                                int8=int8, conf=conf_thresh, iou=iou_thresh, roi=roi, input_size=input_size,
+                                class_weights=class_weights).start()
+    uploader = Uploader(DASHBOARD_URL).start()
+    aggregator = None
+    if segment_m:
+        aggregator = SegmentAggregator(uploader.submit, segment_m=segment_m, score_thresh=score_thresh)
+
+    processed = 0
+    offset = None
+    try:
+        for frame_num, stamp, detections, score, classes in runner.results():
+            if live:
+                if offset is None:
+                    offset = gps_track.replay_offset(stamp)
+                t = stamp + offset
+            else:
+                t = gps_track.start + stamp
+            lat, lng = gps_track.locate(t)
+            if aggregator is not None:
+                aggregator.add(lat, lng, t, format_time(t), score)
+            else:
+                uploader.submit({"longitude": lng, "latitude": lat, "timestamp": format_time(t), "score": score*100})
+            processed += 1
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        runner.stop()
+        if aggregator is not None:
+            aggregator.flush()
+        uploader.stop()
+    print(f"Processed {processed} frames with {workers} inference processes.")
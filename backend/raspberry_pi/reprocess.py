@@ -0,0 +1,213 @@
+import argparse
+import csv
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+import numpy as np
+
+from backends import DEFAULT_WEIGHTS
+from gps_track import GpsTrack, format_time
+from model_server import get_detector
+from scoring import boxes_to_numpy, score_detections
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+CSV_FIELDS = ["latitude", "longitude", "timestamp", "score"]
+
+# Loaded once per worker process by _init_worker
+_worker = {}
+
+
+def find_drives(input_dir):
+    """Pair every video in `input_dir` with its GPS log (same name, .json)."""
+    drives = []
+    for path in sorted(os.listdir(input_dir)):
+        name, ext = os.path.splitext(path)
+        if ext.lower() not in VIDEO_EXTENSIONS:
+            continue
+        gps_path = os.path.join(input_dir, name + ".json")
+        if not os.path.exists(gps_path):
+            print(f"Skipping {path}: no GPS log {name}.json")
+            continue
+        drives.append((name, os.path.join(input_dir, path), gps_path))
+    return drives
+
+
+def keyframe_times(video_path):
+    """Timestamps (s) of the video's keyframes from ffprobe, or None if unavailable."""
+    if shutil.which("ffprobe") is None:
+        return None
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+           "-show_entries", "frame=pts_time", "-of", "csv=p=0", video_path]
+    try:
+        output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    except subprocess.CalledProcessError:
+        return None
+    times = []
+    for line in output.split():
+        # Frames without a timestamp are reported as "N/A"
+        try:
+            times.append(float(line.split(",")[0]))
+        except ValueError:
+            continue
+    return times
+
+
+def plan_segments(video_path, segment_s):
+    """
+    Split a video into (start_frame, end_frame) ranges of roughly `segment_s` seconds.
+
+    Boundaries are moved to the next keyframe when ffprobe is available, so every
+    worker starts decoding on a keyframe and no frames are decoded twice.
+    """
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    step = max(1, int(segment_s * fps))
+    boundaries = list(range(0, total, step))
+    keyframes = keyframe_times(video_path)
+    if keyframes:
+        key_frames = np.round(np.asarray(keyframes) * fps).astype(int)
+        idx = np.searchsorted(key_frames, boundaries)
+        snapped = [int(key_frames[i]) for i in idx if i < len(key_frames)]
+        boundaries = sorted(set([0] + snapped))
+    boundaries.append(total)
+    return fps, [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+
+def _init_worker(weights, backend, int8, conf_thresh, iou_thresh):
+    # The pool already uses every core; threaded kernels inside each worker would oversubscribe them
+    cv2.setNumThreads(1)
+    try:
+        import torch
+
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+    _worker["model"] = get_detector(weights, backend, int8)
+    _worker["conf"] = conf_thresh
+    _worker["iou"] = iou_thresh
+
+
+def process_segment(video_path, gps_path, fps, start_frame, end_frame, out_path):
+    """Score the frames [start_frame, end_frame) of a video and write them to a CSV."""
+    model = _worker["model"]
+    track = GpsTrack.from_json(gps_path)
+
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    times = []
+    scores = []
+    for frame_num in range(start_frame, end_frame):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        results = model(frame, conf=_worker["conf"], iou=_worker["iou"], verbose=False)
+        height, width = frame.shape[:2]
+        score, _ = score_detections(boxes_to_numpy(results), width, height)
+        times.append(track.start + frame_num / fps)
+        scores.append(score)
+    cap.release()
+
+    # Position every frame of the segment in one vectorized lookup
+    lats, lons = track.locate_many(times)
+    rows = [{
+        "latitude": float(lat),
+        "longitude": float(lon),
+        "timestamp": format_time(t),
+        "score": round(score * 100, 2),
+    } for t, lat, lon, score in zip(times, lats, lons, scores)]
+
+    # Write to a temporary file first so a crash never leaves a half-written segment
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, out_path)
+    return len(rows)
+
+
+def merge_segments(segment_paths, out_path):
+    """Concatenate the segment CSVs of one drive, in time order, into one CSV."""
+    with open(out_path, "w", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for path in segment_paths:
+            with open(path, newline="") as f:
+                writer.writerows(csv.DictReader(f))
+
+
+def reprocess(input_dir, output_dir, workers=None, segment_s=60, weights=DEFAULT_WEIGHTS, backend="pytorch",
+              int8=False, conf_thresh=0.25, iou_thresh=0.5):
+    """
+    Reprocess every recorded drive in `input_dir` across a pool of processes.
+
+    Each video is split into keyframe-aligned segments that are scored in parallel.
+    Finished segments are kept under `output_dir/segments`, named by their frame
+    range, so rerunning after a crash only processes the missing ones (and a rerun
+    with another segment length never reuses segments that do not fit). Each drive is merged into
+    `output_dir/<video>.csv` with the same columns as data/*.csv.
+    """
+    segment_dir = os.path.join(output_dir, "segments")
+    os.makedirs(segment_dir, exist_ok=True)
+
+    jobs = []
+    drive_segments = {}
+    for name, video_path, gps_path in find_drives(input_dir):
+        fps, segments = plan_segments(video_path, segment_s)
+        paths = []
+        for start, end in segments:
+            out_path = os.path.join(segment_dir, f"{name}_{start:08d}-{end:08d}.csv")
+            paths.append(out_path)
+            if not os.path.exists(out_path):
+                jobs.append((video_path, gps_path, fps, start, end, out_path))
+        drive_segments[name] = paths
+
+    total_segments = sum(len(paths) for paths in drive_segments.values())
+    print(f"{len(drive_segments)} drives, {total_segments} segments, {len(jobs)} left to process")
+
+    started = time.monotonic()
+    frames = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(weights, backend, int8, conf_thresh, iou_thresh)) as pool:
+        futures = {pool.submit(process_segment, *job): job for job in jobs}
+        for done, future in enumerate(as_completed(futures), 1):
+            segment = os.path.basename(futures[future][-1])
+            try:
+                frames += future.result()
+            except Exception as e:
+                print(f"Error processing {segment}: {e}")
+            elapsed = time.monotonic() - started
+            eta = elapsed / done * (len(jobs) - done)
+            print(f"[{done}/{len(jobs)}] {segment} {frames / elapsed:.1f} fps, ETA {eta / 60:.1f} min")
+
+    merged = 0
+    for name, paths in drive_segments.items():
+        if all(os.path.exists(path) for path in paths):
+            merge_segments(paths, os.path.join(output_dir, f"{name}.csv"))
+            merged += 1
+        else:
+            print(f"Not merging {name}: some segments failed, rerun to resume")
+    print(f"Merged {merged}/{len(drive_segments)} drives into {output_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reprocess recorded drives in parallel")
+    parser.add_argument("input_dir", help="directory of videos, each with a <name>.json GPS log")
+    parser.add_argument("output_dir", help="directory for the per-drive CSVs")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--segment-seconds", type=float, default=60)
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS)
+    parser.add_argument("--backend", default="pytorch")
+    parser.add_argument("--int8", action="store_true")
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--iou", type=float, default=0.5)
+    args = parser.parse_args()
+    reprocess(args.input_dir, args.output_dir, args.workers, args.segment_seconds, args.weights,
+              args.backend, args.int8, args.conf, args.iou)
@@ -0,0 +1,112 @@
+import json
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+STRIDE = 32
+PAD_VALUE = 114
+
+# Geometry of one prepared frame: the ROI in frame pixels and how it was letterboxed
+Letterbox = namedtuple("Letterbox", ["x0", "y0", "width", "height", "scale", "pad_x", "pad_y"])
+
+
+class RoiPreprocessor:
+    """
+    Crop frames to the road region and letterbox them to the model input size.
+
+    The ROI is given as fractions of the frame (x1, y1, x2, y2), so one calibration
+    works for every resolution of the same camera mount. The crop is a view of the
+    frame, and the letterbox canvas is reused between frames. Boxes predicted on the
+    prepared image are mapped back to ROI coordinates (for scoring against the ROI
+    area) and to full-frame coordinates (for annotation).
+
+    Parameters:
+        roi (tuple): (x1, y1, x2, y2) fractions of the frame. None uses the whole frame.
+        input_size (int): Longest side of the model input. None skips resizing.
+    """
+
+    def __init__(self, roi=None, input_size=640):
+        self.roi = tuple(roi) if roi is not None else (0.0, 0.0, 1.0, 1.0)
+        self.input_size = input_size
+        self._shape = None
+        self._geometry = None
+        self._canvas = None
+
+    @classmethod
+    def from_file(cls, path, input_size=640):
+        """Load a calibrated ROI saved by `calibrate_roi`."""
+        with open(path) as f:
+            return cls(json.load(f)["roi"], input_size)
+
+    def region(self, frame_shape):
+        """ROI of a frame of this shape in pixels, as (x1, y1, x2, y2)."""
+        height, width = frame_shape[:2]
+        fx1, fy1, fx2, fy2 = self.roi
+        return (int(round(fx1 * width)), int(round(fy1 * height)),
+                int(round(fx2 * width)), int(round(fy2 * height)))
+
+    def prepare(self, frame):
+        """Return (image, letterbox) with the image ready to hand to the model."""
+        if frame.shape != self._shape:
+            self._setup(frame.shape)
+        lb = self._geometry
+        crop = frame[lb.y0:lb.y0 + lb.height, lb.x0:lb.x0 + lb.width]
+        if self._canvas is None:
+            return crop, lb
+
+        new_w = int(round(lb.width * lb.scale))
+        new_h = int(round(lb.height * lb.scale))
+        self._canvas[lb.pad_y:lb.pad_y + new_h, lb.pad_x:lb.pad_x + new_w] = cv2.resize(
+            crop, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        return self._canvas, lb
+
+    def to_roi(self, detections, lb):
+        """Map [x1, y1, x2, y2, ...] rows from the model input back to ROI pixels."""
+        mapped = detections.copy()
+        mapped[:, [0, 2]] = (mapped[:, [0, 2]] - lb.pad_x) / lb.scale
+        mapped[:, [1, 3]] = (mapped[:, [1, 3]] - lb.pad_y) / lb.scale
+        return mapped
+
+    def to_frame(self, roi_detections, lb):
+        """Shift rows in ROI pixels to full-frame pixels."""
+        mapped = roi_detections.copy()
+        mapped[:, [0, 2]] += lb.x0
+        mapped[:, [1, 3]] += lb.y0
+        return mapped
+
+    def _setup(self, shape):
+        x1, y1, x2, y2 = self.region(shape)
+        width, height = x2 - x1, y2 - y1
+        self._shape = shape
+        self._canvas = None
+        if self.input_size is None:
+            self._geometry = Letterbox(x1, y1, width, height, 1.0, 0, 0)
+            return
+
+        # Fit the longest side to the input size, then pad to the model stride
+        scale = self.input_size / max(width, height)
+        new_w, new_h = int(round(width * scale)), int(round(height * scale))
+        canvas_w = int(np.ceil(new_w / STRIDE) * STRIDE)
+        canvas_h = int(np.ceil(new_h / STRIDE) * STRIDE)
+        pad_x, pad_y = (canvas_w - new_w) // 2, (canvas_h - new_h) // 2
+        self._geometry = Letterbox(x1, y1, width, height, scale, pad_x, pad_y)
+        self._canvas = np.full((canvas_h, canvas_w) + tuple(shape[2:]), PAD_VALUE, dtype=np.uint8)
+
+
+def calibrate_roi(video_path, out_path="roi.json"):
+    """Pick the road region on the first frame of a video or camera and save it."""
+    cap = cv2.VideoCapture(video_path)
+    ret, frame = cap.read()
+    cap.release()
+    if not ret:
+        raise Exception(f"Could not read a frame from {video_path}")
+
+    x, y, w, h = cv2.selectROI("Select the road region", frame, showCrosshair=False)
+    cv2.destroyAllWindows()
+    height, width = frame.shape[:2]
+    roi = [x / width, y / height, (x + w) / width, (y + h) / height]
+    with open(out_path, "w") as f:
+        json.dump({"roi": roi}, f)
+    print(f"Saved ROI {roi} to {out_path}")
+    return roi
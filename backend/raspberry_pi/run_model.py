@@ -1,17 +1,11 @@
-import torch
-from torchvision import transforms
-from PIL import Image
+from model_server import CLASSIFIER_WEIGHTS, get_classifier
 
 
-def run_model(image_path, model_path="road_condition_model.pth"):
-    model = torch.load(model_path)
-    model.eval()
+def run_model(image_path, model_path=CLASSIFIER_WEIGHTS):
+    # The classifier is loaded and warmed up once, then reused by every call
+    return get_classifier(model_path).predict([image_path])[0]  # Example classification result
 
-    transform = transforms.Compose(
-        [transforms.Resize((224, 224)), transforms.ToTensor()]
-    )
 
-    image = Image.open(image_path).convert("RGB")
-    input_tensor = transform(image).unsqueeze(0)
-    result = model(input_tensor)
-    return torch.argmax(result, dim=1).item()  # Example classification result
+def run_model_batch(images, model_path=CLASSIFIER_WEIGHTS):
+    """Classify several images (paths, PIL images or BGR arrays) in one batched call."""
+    return get_classifier(model_path).predict(images)
@@ -0,0 +1,88 @@
+import math
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres between two (lat, lon) points in degrees."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class InferenceScheduler:
+    """
+    Decide which frames get inference from the distance the vehicle has travelled.
+
+    A frame is inferred when the vehicle has moved at least `min_spacing_m` since the
+    last inferred frame, or when `max_interval_s` has passed (latency cap). While the
+    vehicle is stationary the latency cap is relaxed to `stationary_interval_s`, so a
+    car waiting at a light does not re-run the model on the same pavement. Frames that
+    are not inferred reuse the last result.
+
+    Parameters:
+        min_spacing_m (float): Metres travelled between inferred frames. 0 infers every frame.
+        max_interval_s (float): Maximum seconds between inferred frames while moving.
+        stationary_speed_mps (float): Speed below which the vehicle counts as stationary.
+        stationary_interval_s (float): Maximum seconds between inferred frames while stationary.
+        speed_smoothing (float): Weight of the newest sample in the speed moving average.
+    """
+
+    def __init__(self, min_spacing_m=2.0, max_interval_s=1.0, stationary_speed_mps=0.5,
+                 stationary_interval_s=10.0, speed_smoothing=0.2):
+        self.min_spacing_m = min_spacing_m
+        self.max_interval_s = max_interval_s
+        self.stationary_speed_mps = stationary_speed_mps
+        self.stationary_interval_s = stationary_interval_s
+        self.speed_smoothing = speed_smoothing
+
+        self.speed_mps = None
+        self.inferred = 0
+        self.skipped = 0
+        self._last_fix = None
+        self._last_inferred = None
+
+    @property
+    def stationary(self):
+        return self.speed_mps is not None and self.speed_mps < self.stationary_speed_mps
+
+    def should_infer(self, lat, lng, t):
+        """
+        Return True if the frame at (lat, lng) and time `t` (seconds) needs inference.
+        """
+        self._update_speed(lat, lng, t)
+
+        if self._last_inferred is None or self.min_spacing_m <= 0:
+            return self._mark_inferred(lat, lng, t)
+
+        last_lat, last_lng, last_t = self._last_inferred
+        if haversine_m(last_lat, last_lng, lat, lng) >= self.min_spacing_m:
+            return self._mark_inferred(lat, lng, t)
+
+        max_interval = self.stationary_interval_s if self.stationary else self.max_interval_s
+        if t - last_t >= max_interval:
+            return self._mark_inferred(lat, lng, t)
+
+        self.skipped += 1
+        return False
+
+    def _mark_inferred(self, lat, lng, t):
+        self._last_inferred = (lat, lng, t)
+        self.inferred += 1
+        return True
+
+    def _update_speed(self, lat, lng, t):
+        if self._last_fix is not None:
+            last_lat, last_lng, last_t = self._last_fix
+            dt = t - last_t
+            # Frames arrive faster than GPS fixes; wait for a new fix unless it is overdue
+            if dt <= 0 or ((lat, lng) == (last_lat, last_lng) and dt < 1.0):
+                return
+            speed = haversine_m(last_lat, last_lng, lat, lng) / dt
+            if self.speed_mps is None:
+                self.speed_mps = speed
+            else:
+                self.speed_mps += self.speed_smoothing * (speed - self.speed_mps)
+        self._last_fix = (lat, lng, t)
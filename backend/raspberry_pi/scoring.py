@@ -0,0 +1,112 @@
+import numpy as np
+
+
+def boxes_to_numpy(results):
+    """
+    Pull the detections of a YOLO call to the CPU in one transfer.
+
+    Returns an (N, 6) float32 array of [x1, y1, x2, y2, conf, cls] rows.
+    """
+    arrays = [result.boxes.data.cpu().numpy() for result in results if len(result.boxes)]
+    if not arrays:
+        return np.zeros((0, 6), dtype=np.float32)
+    return np.concatenate(arrays).astype(np.float32, copy=False)
+
+
+def _coverage(xyxy, width, height):
+    """
+    Compress the box edges into an (nx, ny) grid of cells.
+
+    Returns (in_x, in_y, cell_area): in_x[k] / in_y[k] flag the grid columns / rows
+    spanned by box k, and cell_area holds the pixel area of each cell.
+    """
+    boxes = np.empty_like(xyxy, dtype=np.float64)
+    boxes[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, width)
+    boxes[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, height)
+
+    xs = np.unique(boxes[:, [0, 2]])
+    ys = np.unique(boxes[:, [1, 3]])
+    # A grid cell is covered by a box if the box contains the cell's lower corner
+    in_x = (boxes[:, 0:1] <= xs[None, :-1]) & (xs[None, :-1] < boxes[:, 2:3])
+    in_y = (boxes[:, 1:2] <= ys[None, :-1]) & (ys[None, :-1] < boxes[:, 3:4])
+    cell_area = np.diff(xs)[:, None] * np.diff(ys)[None, :]
+    return in_x, in_y, cell_area
+
+
+def score_detections(detections, width, height, class_weights=None):
+    """
+    Score a frame from its detections using the union of the damaged area.
+
+    Overlapping boxes are only counted once, so the score stays within [0, 1]. The
+    union is computed exactly by compressing the box edges into a grid of cells.
+
+    Parameters:
+        detections (np.ndarray): (N, 6) array of [x1, y1, x2, y2, conf, cls] rows.
+        width (int): Width of the scored area in pixels.
+        height (int): Height of the scored area in pixels.
+        class_weights (dict): Optional weight per class ID; classes not listed weigh 1.
+            Where boxes of different classes overlap, the highest weight counts.
+
+    Returns:
+        tuple: (score, breakdown) where score is 1 - weighted damaged fraction and
+            breakdown maps each class ID to its box count, union area fraction and
+            highest confidence.
+    """
+    area = float(width * height)
+    if len(detections) == 0 or area <= 0:
+        return 1.0, {}
+
+    classes = detections[:, 5].astype(np.int64)
+    in_x, in_y, cell_area = _coverage(detections[:, :4], width, height)
+
+    breakdown = {}
+    cell_weight = np.zeros_like(cell_area)
+    for cls in np.unique(classes):
+        mask = classes == cls
+        # Number of boxes of this class covering each cell, via one matrix product
+        covered = (in_x[mask].T.astype(np.float32) @ in_y[mask].astype(np.float32)) > 0
+        weight = 1.0 if class_weights is None else class_weights.get(int(cls), 1.0)
+        np.maximum(cell_weight, covered * weight, out=cell_weight)
+        breakdown[int(cls)] = {
+            "count": int(mask.sum()),
+            "area": float((cell_area * covered).sum() / area),
+            "max_conf": float(detections[mask, 4].max()),
+        }
+
+    damaged = float((cell_area * cell_weight).sum() / area)
+    return min(max(1.0 - damaged, 0.0), 1.0), breakdown
+
+
+def nms(detections, iou_thresh):
+    """
+    Class-aware non-maximum suppression of an (N, 6) detection array.
+
+    Boxes are offset by class so boxes of different classes never suppress each
+    other. Returns the kept rows in descending confidence.
+    """
+    if len(detections) < 2:
+        return detections
+    order = np.argsort(-detections[:, 4], kind="stable")
+    dets = detections[order]
+    offset = dets[:, 5:6] * (float(dets[:, :4].max()) + 1.0)
+    boxes = dets[:, :4] + offset
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+    # Pairwise IoU once, then a greedy pass over the (few) boxes of a frame
+    x1 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    y1 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    x2 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+    y2 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    iou = inter / np.maximum(area[:, None] + area[None, :] - inter, 1e-9)
+
+    keep = np.ones(len(dets), dtype=bool)
+    for i in range(len(dets)):
+        if keep[i]:
+            keep[i + 1:] &= iou[i, i + 1:] <= iou_thresh
+    return dets[keep]
+
+
+def filter_detections(detections, conf_thresh, iou_thresh):
+    """Apply a confidence threshold and NMS to detections made with looser thresholds."""
+    return nms(detections[detections[:, 4] >= conf_thresh], iou_thresh)
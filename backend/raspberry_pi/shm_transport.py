@@ -0,0 +1,243 @@
+import heapq
+import multiprocessing as mp
+import queue
+import time
+import traceback
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from backends import DEFAULT_WEIGHTS
+
+PICAMERA = "picamera"
+
+
+class WorkerError(Exception):
+    """Raised by `SharedMemoryRunner.results` when an inference process failed."""
+
+
+class SharedFrameRing:
+    """
+    Ring of frame slots in one `multiprocessing.shared_memory` block.
+
+    Processes exchange slot indices instead of frames: the capture process decodes
+    straight into a slot and inference workers read the same memory, so frames are
+    never pickled or copied between processes. A ring pickled for a child process
+    (spawn/forkserver start methods) re-attaches to the same block by name, so it
+    works with any start method.
+
+    Parameters:
+        shape (tuple): Frame shape, e.g. (height, width, 3).
+        slots (int): Number of frame slots.
+        name (str): Attach to the existing block of this name instead of creating one.
+    """
+
+    def __init__(self, shape, slots=8, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        # Only the process that created the block unlinks it
+        self._owner = name is None
+        if self._owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=frame_bytes * slots)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self._frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    def __reduce__(self):
+        # Pickling the ndarray would copy the frames; send the block's name instead
+        return (SharedFrameRing, (self.shape, self.slots, self.shm.name))
+
+    def slot(self, index):
+        return self._frames[index]
+
+    def close(self):
+        self._frames = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def probe_frame_shape(source, frame_size=(640, 480)):
+    """Frame shape of an OpenCV source, or of a Picamera2 configured with `frame_size`."""
+    if source == PICAMERA:
+        return (frame_size[1], frame_size[0], 3)
+    cap = cv2.VideoCapture(source)
+    ret, frame = cap.read()
+    cap.release()
+    if not ret:
+        raise Exception(f"Could not read a frame from {source}")
+    return frame.shape
+
+
+def _capture_main(ring, source, frame_size, free_slots, ready, stop, workers):
+    """Capture process: decode frames into free ring slots and announce them to the workers."""
+    live = source == PICAMERA or isinstance(source, int)
+    if source == PICAMERA:
+        from frame_pool import PicameraSource
+
+        # Captures are copied straight into the ring slots, so the source needs no pool
+        camera = PicameraSource(frame_size, pool_size=0)
+    else:
+        cap = cv2.VideoCapture(source)
+
+    frame_num = 0
+    try:
+        while not stop.is_set():
+            try:
+                slot = free_slots.get(timeout=0.1)
+            except queue.Empty:
+                # Every slot is busy: live cameras skip a frame to stay current, files wait
+                if live and source != PICAMERA:
+                    cap.grab()
+                continue
+
+            frame = ring.slot(slot)
+            if source == PICAMERA:
+                camera.read_into(frame)
+                ret = True
+            else:
+                ret, decoded = cap.read(frame)
+                if ret and decoded is not frame:
+                    np.copyto(frame, decoded)
+            if not ret:
+                free_slots.put(slot)
+                break
+
+            stamp = (datetime.now() - datetime(1970, 1, 1)).total_seconds() if live \
+                else cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            ready.put((slot, frame_num, stamp))
+            frame_num += 1
+    finally:
+        if source == PICAMERA:
+            camera.close()
+        else:
+            cap.release()
+        for _ in range(workers):
+            ready.put(None)
+
+
+def _worker_main(ring, ready, free_slots, results, config):
+    """Inference process: run the model on frames in the ring and send back detections."""
+    try:
+        from model_server import get_detector
+        from roi import RoiPreprocessor
+        from scoring import boxes_to_numpy, score_detections
+
+        model = get_detector(config["weights"], config["backend"], config["int8"], imgsz=config["input_size"])
+        preprocessor = RoiPreprocessor(config["roi"], config["input_size"])
+        while True:
+            job = ready.get()
+            if job is None:
+                break
+            slot, frame_num, stamp = job
+            try:
+                image, lb = preprocessor.prepare(ring.slot(slot))
+                output = model(image, conf=config["conf"], iou=config["iou"], verbose=False)
+            finally:
+                # The letterboxed copy (or the model) is done with the slot
+                free_slots.put(slot)
+            detections = preprocessor.to_roi(boxes_to_numpy(output), lb)
+            score, classes = score_detections(detections, lb.width, lb.height, config["class_weights"])
+            results.put((frame_num, stamp, preprocessor.to_frame(detections, lb), score, classes))
+    except Exception:
+        results.put(WorkerError(f"{mp.current_process().name} failed:\n{traceback.format_exc()}"))
+    finally:
+        results.put(None)
+
+
+class SharedMemoryRunner:
+    """
+    Run capture and inference in separate processes connected by a shared-memory ring.
+
+    One capture process fills the ring from an OpenCV file/camera source or from
+    Picamera2 (source="picamera"); `workers` inference processes score the frames.
+    The number of slots bounds the frames in flight (backpressure). `results()`
+    yields (frame_num, stamp, detections, score, classes) in frame order, where
+    stamp is the video position in seconds for files and epoch seconds for cameras.
+
+    Parameters:
+        source (str or int): Video path, camera index or "picamera".
+        workers (int): Number of inference processes.
+        slots (int): Number of frame slots in the ring.
+        frame_size (tuple): Picamera2 capture (width, height).
+        **config: Inference settings: weights, backend, int8, conf, iou, roi,
+            input_size, class_weights.
+    """
+
+    def __init__(self, source, workers=3, slots=8, frame_size=(640, 480), **config):
+        self.source = source
+        self.workers = workers
+        self.frame_size = frame_size
+        self.config = dict(weights=DEFAULT_WEIGHTS, backend="pytorch", int8=False,
+                           conf=0.25, iou=0.5, roi=None, input_size=640, class_weights=None)
+        self.config.update(config)
+
+        self.ring = SharedFrameRing(probe_frame_shape(source, frame_size), slots)
+        self.free_slots = mp.Queue()
+        for slot in range(slots):
+            self.free_slots.put(slot)
+        self.ready = mp.Queue()
+        self.results_queue = mp.Queue()
+        self.stop_event = mp.Event()
+        self.processes = []
+
+    def start(self):
+        self.processes.append(mp.Process(
+            target=_capture_main, name="capture", daemon=True,
+            args=(self.ring, self.source, self.frame_size, self.free_slots, self.ready, self.stop_event,
+                  self.workers)))
+        for i in range(self.workers):
+            self.processes.append(mp.Process(
+                target=_worker_main, name=f"inference-{i}", daemon=True,
+                args=(self.ring, self.ready, self.free_slots, self.results_queue, self.config)))
+        for p in self.processes:
+            p.start()
+        return self
+
+    def results(self, poll_s=0.5):
+        """
+        Yield worker results in frame order until every worker has finished.
+
+        Raises WorkerError as soon as a worker reports an exception, or once every
+        worker has exited while some never signalled the end (e.g. killed).
+        """
+        workers = self.processes[1:]
+        pending = []
+        next_frame = 0
+        running = self.workers
+        while running:
+            try:
+                result = self.results_queue.get(timeout=poll_s)
+            except queue.Empty:
+                if any(p.is_alive() for p in workers):
+                    continue
+                # Everything a dead worker sent arrives before get() times out again
+                try:
+                    result = self.results_queue.get(timeout=poll_s)
+                except queue.Empty:
+                    raise WorkerError(f"{running} inference process(es) exited without finishing")
+            if result is None:
+                running -= 1
+                continue
+            if isinstance(result, WorkerError):
+                raise result
+            heapq.heappush(pending, (result[0], result))
+            while pending and pending[0][0] == next_frame:
+                yield heapq.heappop(pending)[1]
+                next_frame += 1
+        # Frames lost to a failed worker leave gaps; flush the rest in order
+        while pending:
+            yield heapq.heappop(pending)[1]
+
+    def stop(self, timeout=5.0):
+        """Stop capturing, let the workers drain, and free the shared memory."""
+        self.stop_event.set()
+        deadline = time.monotonic() + timeout
+        for p in self.processes:
+            p.join(max(0.0, deadline - time.monotonic()))
+            if p.is_alive():
+                p.terminate()
+        self.ring.close()
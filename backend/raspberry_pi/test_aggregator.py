@@ -0,0 +1,39 @@
+from aggregator import SegmentAggregator
+
+# Degrees of latitude per metre
+DEG_PER_M = 1 / 111320
+
+
+def drive(scores, metres_per_frame=1.0, fps=10.0, **kwargs):
+    segments = []
+    aggregator = SegmentAggregator(segments.append, **kwargs)
+    for i, score in enumerate(scores):
+        t = i / fps
+        aggregator.add(37.45 + i * metres_per_frame * DEG_PER_M, 126.65, t, f"t{i}", score)
+    aggregator.flush()
+    return segments
+
+
+def test_consecutive_low_frames_share_a_segment():
+    segments = drive([0.9] * 5 + [0.3] * 6 + [0.9] * 4, segment_m=10.0, max_duration_s=5.0)
+
+    assert [s["frames"] for s in segments] == [5, 6, 4]
+    low = segments[1]
+    assert low["score"] == 30.0 and low["min_score"] == 30.0
+    assert low["start_time"] == "t5" and low["end_time"] == "t10"
+    assert segments[0]["min_score"] == 90.0 and segments[2]["min_score"] == 90.0
+
+
+def test_long_damaged_stretch_is_split_by_length():
+    segments = drive([0.2] * 25, metres_per_frame=1.5, segment_m=10.0, max_duration_s=60.0)
+
+    # 25 low frames 1.5 m apart: a segment per 10.5 m, not one report per frame
+    assert [s["frames"] for s in segments] == [8, 8, 8, 1]
+    assert all(s["min_score"] == 20.0 for s in segments)
+
+
+def test_without_flush_on_low_scores_are_mixed():
+    segments = drive([0.9, 0.9, 0.3, 0.9], segment_m=100.0, flush_on_low=False)
+
+    assert len(segments) == 1 and segments[0]["frames"] == 4
+    assert segments[0]["min_score"] == 30.0
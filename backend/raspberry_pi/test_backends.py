@@ -0,0 +1,41 @@
+import os
+import sys
+import types
+
+import pytest
+
+from backends import export_weights, exported_path
+
+
+class FakeYOLO:
+    """Writes exports like ultralytics: next to the weights, named without the input size."""
+
+    def __init__(self, weights, task=None):
+        self.weights = weights
+
+    def export(self, format, imgsz, **kwargs):
+        stem, _ = os.path.splitext(self.weights)
+        path = f"{stem}.onnx"
+        with open(path, "w") as f:
+            f.write(str(imgsz))
+        return path
+
+
+@pytest.fixture
+def fake_ultralytics(monkeypatch):
+    monkeypatch.setitem(sys.modules, "ultralytics", types.SimpleNamespace(YOLO=FakeYOLO))
+
+
+def test_exports_of_two_sizes_do_not_overwrite_each_other(tmp_path, fake_ultralytics):
+    weights = tmp_path / "best.pt"
+    weights.write_bytes(b"weights")
+
+    default = export_weights(str(weights), "onnx")
+    small = export_weights(str(weights), "onnx", imgsz=320)
+
+    assert default == exported_path(str(weights), "onnx") == str(tmp_path / "best.onnx")
+    assert small == exported_path(str(weights), "onnx", imgsz=320) == str(tmp_path / "best_320.onnx")
+    assert open(default).read() == "640"
+    assert open(small).read() == "320"
+    # Nothing else is left next to the weights
+    assert sorted(os.listdir(tmp_path)) == ["best.onnx", "best.pt", "best_320.onnx"]
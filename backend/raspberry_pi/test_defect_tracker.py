@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from defect_tracker import TRACK_SPACING_M, DefectTracker
+from scheduler import InferenceScheduler
+
+FPS = 30
+FOCAL_PX = 800.0
+CAMERA_HEIGHT_M = 1.2
+HORIZON_Y = 300.0
+METRES_PER_DEG_LAT = 111320.0
+
+
+def pothole_box(distance_m, lateral_m, length_m=0.6, width_m=0.8):
+    """Pinhole projection of a pothole lying on the road `distance_m` ahead."""
+    near, far = distance_m - length_m / 2, distance_m + length_m / 2
+    x1 = 640 + FOCAL_PX * (lateral_m - width_m / 2) / distance_m
+    x2 = 640 + FOCAL_PX * (lateral_m + width_m / 2) / distance_m
+    return [x1, HORIZON_Y + FOCAL_PX * CAMERA_HEIGHT_M / far, x2, HORIZON_Y + FOCAL_PX * CAMERA_HEIGHT_M / near]
+
+
+def drive(speed_mps, potholes, scheduler, tracker, visible=(2.5, 10.0), conf=0.4):
+    """
+    Drive past potholes at (position along the road, lateral offset), updating the
+    tracker on the frames the scheduler lets through. Potholes are detected from
+    `visible` metres ahead with a confidence between the low and high thresholds
+    of the old defaults.
+    """
+    updates = 0
+    seconds = (max(position for position, _ in potholes) + 1.0) / speed_mps
+    for frame_index in range(int(seconds * FPS)):
+        t = frame_index / FPS
+        travelled = speed_mps * t
+        lat = 37.0 + travelled / METRES_PER_DEG_LAT
+        if not scheduler.should_infer(lat, 127.0, t):
+            continue
+        rows = []
+        for position, lateral in potholes:
+            distance = position - travelled
+            if visible[0] <= distance <= visible[1]:
+                rows.append(pothole_box(distance, lateral) + [conf, 0])
+        tracker.update(np.array(rows, dtype=np.float64).reshape(-1, 6), frame_index, lat, 127.0, f"{t:.2f}")
+        updates += 1
+    tracker.flush()
+    return updates
+
+
+@pytest.mark.parametrize("speed_kmh", [15, 30, 50, 80])
+def test_each_pothole_is_reported_once_at_driving_speeds(speed_kmh):
+    events = []
+    # The spacing process_video uses while tracking, with a detector threshold of 0.25
+    scheduler = InferenceScheduler(min_spacing_m=TRACK_SPACING_M)
+    tracker = DefectTracker(events.append, high_thresh=0.25)
+
+    drive(speed_kmh / 3.6, [(30.0, -1.0), (60.0, 1.5)], scheduler, tracker)
+
+    assert len(events) == 2
+    assert all(event["frames"] >= tracker.min_hits for event in events)
+    assert all(event["confidence"] == pytest.approx(0.4) for event in events)
+
+
+def test_single_frame_flash_is_not_reported():
+    events = []
+    tracker = DefectTracker(events.append)
+    tracker.update(np.array([[100, 400, 200, 450, 0.9, 0]], dtype=np.float64), 0, 37.0, 127.0, "0")
+    for frame_index in range(1, 10):
+        tracker.update(np.zeros((0, 6)), frame_index, 37.0, 127.0, str(frame_index))
+    tracker.flush()
+
+    assert events == []
@@ -0,0 +1,34 @@
+import multiprocessing as mp
+import pickle
+
+import numpy as np
+
+from shm_transport import SharedFrameRing
+
+
+def _fill(ring, slot, value):
+    ring.slot(slot)[:] = value
+
+
+def test_pickled_ring_shares_memory():
+    ring = SharedFrameRing((4, 6, 3), slots=2)
+    try:
+        clone = pickle.loads(pickle.dumps(ring))
+        clone.slot(1)[:] = 7
+        assert np.all(ring.slot(1) == 7)
+        clone.close()
+    finally:
+        ring.close()
+
+
+def test_spawned_process_writes_into_the_ring():
+    ctx = mp.get_context("spawn")
+    ring = SharedFrameRing((4, 6, 3), slots=2)
+    try:
+        p = ctx.Process(target=_fill, args=(ring, 0, 9))
+        p.start()
+        p.join(30)
+        assert p.exitcode == 0
+        assert np.all(ring.slot(0) == 9)
+    finally:
+        ring.close()
@@ -0,0 +1,213 @@
+import json
+import os
+import queue
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Uploader:
+    """
+    Background uploader that ships dashboard reports off the frame loop.
+
+    Reports are put on a bounded in-memory queue and sent by a worker thread over a
+    pooled keep-alive session, each batch as one JSON array request to the dashboard's
+    bulk ingest endpoint. A batch is sent once `batch_size` reports are waiting
+    or `flush_interval` seconds have passed. When the dashboard is unreachable the
+    batch is appended to an on-disk journal (one JSON object per line) and replayed
+    in order once the server answers again. The same happens when the whole batch is
+    refused (a 4xx without per-report errors, e.g. from a proxy or an auth failure);
+    only reports the server lists as invalid are given up on (counted in `rejected`).
+
+    Parameters:
+        url (str): Dashboard endpoint that receives the reports.
+        batch_size (int): Maximum number of reports sent per batch.
+        flush_interval (float): Maximum seconds a report waits before its batch is sent.
+        max_queue (int): Capacity of the in-memory queue.
+        journal_path (str): File used to spool reports while the server is unreachable.
+            Every uploader needs its own; a shared journal gets replayed twice.
+        timeout (float): Timeout in seconds for a single HTTP request.
+        retry_interval (float): Seconds to wait before retrying an unreachable server.
+        metrics (StageMetrics): Records the duration of every request as "upload".
+    """
+
+    def __init__(self, url, batch_size=50, flush_interval=1.0, max_queue=10000,
+                 journal_path="upload_journal.jsonl", timeout=5.0, retry_interval=5.0, metrics=None):
+        self.url = url
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.journal_path = journal_path
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self.metrics = metrics
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.sent = 0
+        self.spooled = 0
+        self.dropped = 0
+        self.rejected = 0
+
+        self._stop = threading.Event()
+        self._next_retry = 0.0
+        self._thread = threading.Thread(target=self._run, name="uploader", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def submit(self, payload):
+        """Queue a report without blocking. Returns False if the queue is full."""
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def stop(self, timeout=10.0):
+        """Flush what is queued (or spool it to the journal) and stop the worker."""
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        self.session.close()
+        print(f"Uploader stopped: sent={self.sent} spooled={self.spooled} dropped={self.dropped} "
+              f"rejected={self.rejected}")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        while not (self._stop.is_set() and self.queue.empty()):
+            batch = self._collect_batch()
+            if self._has_journal() and not self._replay_journal():
+                # Keep the journal in order: new reports go after the spooled ones
+                self._spool(batch)
+                continue
+            self._deliver(batch)
+
+        # Last chance to drain the journal before shutting down
+        if self._has_journal():
+            self._next_retry = 0.0
+            self._replay_journal()
+
+    def _collect_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (self._stop.is_set() and self.queue.empty()):
+                break
+            try:
+                batch.append(self.queue.get(timeout=min(remaining, 0.1)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _deliver(self, batch):
+        if not batch:
+            return
+        if time.monotonic() < self._next_retry:
+            self._spool(batch)
+            return
+        delivered = self._send(batch)
+        if delivered < len(batch):
+            self._spool(batch[delivered:])
+
+    def _send(self, batch):
+        """Post a batch as one JSON array and return how many reports were delivered."""
+        if not batch:
+            return 0
+        start = time.perf_counter()
+        try:
+            response = self.session.post(self.url, json=batch, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            print(f"Dashboard unreachable, spooling reports: {e}")
+            self._next_retry = time.monotonic() + self.retry_interval
+            return 0
+        finally:
+            if self.metrics is not None:
+                self.metrics.record("upload", time.perf_counter() - start)
+        if response.status_code >= 500:
+            print(f"Dashboard error {response.status_code}, spooling reports")
+            self._next_retry = time.monotonic() + self.retry_interval
+            return 0
+
+        try:
+            result = response.json()
+        except ValueError:
+            result = None
+        if not isinstance(result, dict):
+            result = {}
+        rejected = result.get("errors")
+        rejected = [error for error in rejected if isinstance(error, dict)] if isinstance(rejected, list) else []
+        if response.status_code >= 400 and not rejected:
+            # Nothing says which reports are invalid, so the batch is kept and retried
+            print(f"Dashboard refused batch ({response.status_code}), spooling reports: {response.text[:200]}")
+            self._next_retry = time.monotonic() + self.retry_interval
+            return 0
+
+        # The server stores the valid reports of a batch and lists the rejected ones;
+        # retrying those would never succeed, so they count as delivered too
+        for error in rejected:
+            index = error.get("index")
+            report = batch[index] if isinstance(index, int) and 0 <= index < len(batch) else None
+            print(f"Dashboard rejected report {report}: {error.get('error')}")
+        self.rejected += len(rejected)
+        accepted = result.get("accepted")
+        self.sent += accepted if isinstance(accepted, int) else len(batch) - len(rejected)
+        return len(batch)
+
+    def _has_journal(self):
+        return os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > 0
+
+    def _spool(self, batch):
+        if not batch:
+            return
+        with open(self.journal_path, "a") as f:
+            for payload in batch:
+                f.write(json.dumps(payload) + "\n")
+        self.spooled += len(batch)
+
+    def _replay_journal(self):
+        """Send spooled reports in order. Returns True once the journal is empty."""
+        if time.monotonic() < self._next_retry:
+            return False
+
+        try:
+            with open(self.journal_path, "r") as f:
+                pending = [json.loads(line) for line in f if line.strip()]
+        except FileNotFoundError:
+            return True
+
+        delivered = 0
+        while delivered < len(pending):
+            chunk = pending[delivered:delivered + self.batch_size]
+            sent = self._send(chunk)
+            delivered += sent
+            if sent < len(chunk):
+                break
+
+        if delivered == len(pending):
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+            return True
+
+        # Rewrite the journal with what is still pending
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for payload in pending[delivered:]:
+                f.write(json.dumps(payload) + "\n")
+        os.replace(tmp_path, self.journal_path)
+        return False
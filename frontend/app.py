@@ -1,7 +1,7 @@
 from dash import Dash, html, dcc
 import dash_bootstrap_components as dbc
 import pandas as pd
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
 import plotly.express as px
 from geopy.geocoders import Nominatim  # type: ignore
 import plotly.graph_objects as go
@@ -9,6 +9,10 @@ import json
 import os
 from datetime import datetime
 from flask import request, jsonify
+from ingest import ingest_request
+from point_store import PointStore
+from downsample import minmax_indices, target_points
+from score_stats import GroupedScoreStats, ScoreStats
 
 app = Dash(
     __name__,
@@ -213,8 +217,21 @@ def get_available_files():
     files = [f for f in os.listdir(data_dir) if f.endswith('.csv')]
     return sorted(files, reverse=True)  # Most recent first
 
-# Global data store to hold incoming data
-data_store = []
+# Score ranges of the pie chart: (min, max, color, label)
+SCORE_RANGES = [
+    (0, 20, '#dc3545', 'Very Bad'),
+    (20, 40, '#fd7e14', 'Bad'),
+    (40, 60, '#ffc107', 'Moderate'),
+    (60, 80, '#87cf3a', 'Good'),
+    (80, 100, '#28a745', 'Very Good')
+]
+SCORE_EDGES = [low for low, _, _, _ in SCORE_RANGES] + [SCORE_RANGES[-1][1]]
+
+# Global data store to hold incoming data, with score statistics per device
+data_store = PointStore(capacity=100000, stats=GroupedScoreStats(SCORE_EDGES))
+
+# Score statistics of every loaded file, computed once when it is loaded
+file_stats = {}
 
 # Cache file path
 CACHE_FILE = 'location_cache.json'
@@ -278,14 +295,10 @@ def prepare_data(df):
 # Flask route to receive POST requests
 @app.server.route('/data', methods=['POST'])
 def receive_data():
-    global data_store
-    data = request.get_json()
-    if data:
-        # Expected data format: dictionary with keys 'latitude', 'longitude', 'timestamp', 'score'
-        data_store.append(data)
-        return jsonify({'status': 'success'}), 200
-    else:
-        return jsonify({'status': 'error', 'message': 'No data received'}), 400
+    # Expected data format: objects with keys 'latitude', 'longitude', 'timestamp', 'score',
+    # one per request or many at once (JSON array, NDJSON, msgpack or packed records)
+    response, status = ingest_request(data_store, request)
+    return jsonify(response), status
 
 
 
@@ -308,6 +321,7 @@ app.layout = html.Div([
         
         dcc.Store(id='store-data'),
         dcc.Store(id='map-data'),
+        dcc.Store(id='graph-width'),  # Pixel width of the line graph
         
         html.Div([
                 dcc.Interval(
@@ -386,11 +400,12 @@ def load_and_prepare_data(selected_file):
         
         # Prepare the data
         prepared_df = prepare_data(df)
+        file_stats[selected_file] = ScoreStats.from_scores(SCORE_EDGES, prepared_df['score'].to_numpy())
         
         # Get file information
-        file_stats = os.stat(file_path)
-        file_size = file_stats.st_size / 1024  # Convert to KB
-        modified_time = datetime.fromtimestamp(file_stats.st_mtime)
+        stat_result = os.stat(file_path)
+        file_size = stat_result.st_size / 1024  # Convert to KB
+        modified_time = datetime.fromtimestamp(stat_result.st_mtime)
         
         file_info = html.Div([
             html.P(f"File: {selected_file}"),
@@ -405,17 +420,36 @@ def load_and_prepare_data(selected_file):
         return None, html.Div(f"Error loading file: {str(e)}", 
                             style={'color': 'red'})
 
+# The line graph draws a fixed number of points per pixel of its width
+app.clientside_callback(
+    """
+    function(n_intervals, width) {
+        const graph = document.getElementById('line-graph');
+        const current = graph ? graph.offsetWidth : 0;
+        return current && current !== width ? current : window.dash_clientside.no_update;
+    }
+    """,
+    Output('graph-width', 'data'),
+    Input('interval-component', 'n_intervals'),
+    State('graph-width', 'data')
+)
+
 @app.callback(
     Output('line-graph', 'figure'),
-    Input('store-data', 'data')
+    [Input('store-data', 'data'),
+     Input('graph-width', 'data')]
 )
-def update_graph(data):
+def update_graph(data, width):
     if not data:
         return go.Figure()
         
     df = pd.DataFrame(data)
     if df.empty:
         return go.Figure()
+
+    # Draw a min/max envelope sized to the graph instead of every point; each
+    # bucket keeps its lowest score so potholes stay visible
+    df = df.iloc[minmax_indices(df['score'].to_numpy(), target_points(width))]
     
     # Create the figure
     fig = px.line(
@@ -467,31 +501,19 @@ def update_graph(data):
 
 @app.callback(
     Output('box-plot', 'figure'),
-    Input('store-data', 'data')
+    Input('store-data', 'data'),
+    State('file-selector', 'value')
 )
-def update_pie_chart(data):
-    if not data:
+def update_pie_chart(data, selected_file):
+    stats = file_stats.get(selected_file)
+    if not data or stats is None or not stats.count:
         return go.Figure()
-        
-    df = pd.DataFrame(data)
-    if df.empty:
-        return go.Figure()
-    
-    # Define score ranges and colors
-    ranges = [
-        (0, 20, '#dc3545', 'Very Bad'),
-        (20, 40, '#fd7e14', 'Bad'),
-        (40, 60, '#ffc107', 'Moderate'),
-        (60, 80, '#87cf3a', 'Good'),
-        (80, 100, '#28a745', 'Very Good')
-    ]
     
-    # Calculate the count of scores in each range
+    # Bucket counts come from the file's statistics, no need to scan the points
     score_distribution = []
     labels = []
     colors = []
-    for min_val, max_val, color, label in ranges:
-        count = len(df[(df['score'] >= min_val) & (df['score'] < max_val)])
+    for (min_val, max_val, color, label), count in zip(SCORE_RANGES, stats.buckets.tolist()):
         if count > 0:  # Only add to pie chart if there are values in this range
             score_distribution.append(count)
             labels.append(f"{label} ({min_val}-{max_val})")
@@ -529,22 +551,21 @@ def update_pie_chart(data):
 
 @app.callback(
     Output('table', 'children'),
-    Input('store-data', 'data')
+    Input('store-data', 'data'),
+    State('file-selector', 'value')
 )
-def update_table(data):
-    if not data:
-        return html.Div("No data available")
-        
-    df = pd.DataFrame(data)
-    if df.empty:
+def update_table(data, selected_file):
+    scores = file_stats.get(selected_file)
+    if not data or scores is None or not scores.count:
         return html.Div("No data available")
     
+    summary = scores.summary()
     stats = {
-        'Minimum Score': df['score'].min(),
-        'Maximum Score': df['score'].max(),
-        'Mean Score': df['score'].mean(),
-        'Standard Deviation': df['score'].std(),
-        'Median Score': df['score'].median()
+        'Minimum Score': summary['min'],
+        'Maximum Score': summary['max'],
+        'Mean Score': summary['mean'],
+        'Standard Deviation': summary['std'],
+        'Median Score': summary['median']
     }
 
     headers = html.Thead(
@@ -1,13 +1,15 @@
-from dash import Dash, html, dcc
+from dash import Dash, html, dcc, no_update, ctx
 import dash_bootstrap_components as dbc
-import pandas as pd
-from dash.dependencies import Input, Output
-import plotly.express as px
+from dash.dependencies import Input, Output, State
 import plotly.graph_objects as go
+import numpy as np
 import os
-import json
 from datetime import datetime
 from flask import request, jsonify
+from ingest import ingest_request
+from point_store import PointStore, format_millis
+from downsample import minmax_indices, target_points
+from score_stats import GroupedScoreStats
 
 # Initialize the app
 app = Dash(
@@ -25,6 +27,7 @@ app = Dash(
         <script>
     let map;
     let markers = [];
+    const MAX_MARKERS = 100000;  // Same as the server's point store
 
     function getScoreColor(score) {
         if (score >= 80) return '#28a745';  // Green for very good
@@ -48,15 +51,22 @@ app = Dash(
     }
 
     window.dashExtensions = {
-        updateMap: function (locationData) {
+        // `delta` holds the columns of the points added since the last update;
+        // only those get new markers, unless the server asks for a reset
+        updateMap: function (delta) {
             if (!map) return;
 
-            clearMarkers();
-            const locations = JSON.parse(locationData);
+            if (delta.reset) clearMarkers();
+            const locations = delta.score.map((score, i) => ({
+                latitude: delta.latitude[i],
+                longitude: delta.longitude[i],
+                timestamp: delta.timestamp[i],
+                score: score
+            }));
 
-            if (!locations || locations.length === 0) return;
+            if (locations.length === 0) return;
 
-            // Add markers for all locations
+            // Add markers for the new locations
             locations.forEach(loc => {
                 const markerColor = getScoreColor(loc.score);
                 const lat = parseFloat(loc.latitude);  // Changed from loc.lat
@@ -95,6 +105,11 @@ app = Dash(
                 markers.push(marker);
             });
 
+            // Drop the oldest markers, like the server drops the oldest points
+            if (markers.length > MAX_MARKERS) {
+                markers.splice(0, markers.length - MAX_MARKERS).forEach(marker => marker.setMap(null));
+            }
+
             // Center the map to the latest point
             if (locations.length > 0) {
                 const lastLocation = locations[locations.length - 1];
@@ -140,14 +155,46 @@ app = Dash(
     '''
 )
 
+def points_since(cursor):
+    """
+    Columns of the points added after `cursor` (a sequence number), for the browser.
+
+    Returns a full reset instead when the client has no cursor, when its points
+    have already been overwritten or when the server restarted (cursor ahead).
+    """
+    reset = cursor is None or cursor > data_store.seq or not data_store.valid(cursor)
+    segments = data_store.segments(None if reset else cursor)
+    start = segments[0][0] if segments else data_store.seq
+    columns = {name: [values for _, segment in segments for values in segment[name].tolist()]
+               for name in ('latitude', 'longitude', 'score')}
+    timestamps = [ts for _, segment in segments for ts in format_millis(segment['timestamp']).tolist()]
+    # Rows overwritten while they were read would be garbage; start over on the next tick
+    if not data_store.valid(start):
+        return None
+    return {
+        'cursor': start + len(timestamps),
+        'reset': reset,
+        'latitude': columns['latitude'],
+        'longitude': columns['longitude'],
+        'timestamp': timestamps,
+        'score': columns['score'],
+    }
+
+
 @app.callback(
-    Output('store-data', 'data'),
-    Input('interval-component', 'n_intervals')
+    [Output('store-data', 'data'),
+     Output('cursor', 'data')],
+    Input('interval-component', 'n_intervals'),
+    State('cursor', 'data')
 )
-def update_from_data_store(n_intervals):
-    if data_store:
-        return json.dumps(data_store)  # Changed to return JSON string directly
-    return '[]'
+def update_from_data_store(n_intervals, cursor):
+    # Only points the browser has not seen yet are sent
+    if cursor is not None and cursor == data_store.seq:
+        return no_update, no_update
+    delta = points_since(cursor)
+    if delta is None:
+        return no_update, None
+    return delta, delta['cursor']
 
 app.clientside_callback(
     """
@@ -162,8 +209,59 @@ app.clientside_callback(
     Input('store-data', 'data')
 )
 
+# Score ranges of the pie chart: (min, max, color, label)
+SCORE_RANGES = [
+    (0, 20, '#dc3545', 'Very Bad'),
+    (20, 40, '#fd7e14', 'Bad'),
+    (40, 80, '#ffc107', 'Moderate'),
+    (80, 90, '#87cf3a', 'Good'),
+    (90, 100, '#28a745', 'Very Good')
+]
+
 # Global variables
-data_store = []  # Store incoming data
+data_store = PointStore(  # Fixed-size columnar store of incoming points
+    capacity=100000,
+    stats=GroupedScoreStats([low for low, _, _, _ in SCORE_RANGES] + [SCORE_RANGES[-1][1]])  # Per device
+)
+
+
+def line_figure(timestamps=(), scores=()):
+    fig = go.Figure(go.Scatter(x=list(timestamps), y=list(scores), mode='lines+markers', name='score'))
+    # uirevision keeps the user's zoom when the figure is replaced with new data
+    fig.update_layout(title='Road Condition Scores Over Time', xaxis_title='Timestamp', yaxis_title='Score',
+                      uirevision='line-graph')
+    return fig
+
+
+def score_series(n_out, time_range=None):
+    """
+    Score series of the stored points, downsampled to at most about `n_out` points.
+
+    Parameters:
+        n_out (int): Number of points to draw, from the graph's pixel width.
+        time_range (list): [start, end] in epoch milliseconds to draw only the
+            visible part at full resolution. None draws the whole history.
+
+    Returns:
+        tuple: (timestamps, scores) lists ordered by time. The min/max envelope
+            keeps every bucket's lowest score, so no pothole disappears.
+    """
+    columns = data_store.columns()
+    timestamps, scores = columns['timestamp'], columns['score']
+    if time_range is not None:
+        inside = (timestamps >= time_range[0]) & (timestamps <= time_range[1])
+        timestamps, scores = timestamps[inside], scores[inside]
+    # Several devices can interleave slightly out of order
+    if len(timestamps) > 1 and np.any(np.diff(timestamps) < 0):
+        order = np.argsort(timestamps, kind='stable')
+        timestamps, scores = timestamps[order], scores[order]
+    keep = minmax_indices(scores, n_out)
+    return format_millis(timestamps[keep]).tolist(), scores[keep].tolist()
+
+
+def axis_millis(value):
+    """Epoch milliseconds of a Plotly date axis value ('2024-11-23 16:30:10.123')."""
+    return int(np.datetime64(str(value).replace(' ', 'T'), 'ms').astype(np.int64))
 
 # Layout
 app.layout = html.Div([
@@ -175,84 +273,112 @@ app.layout = html.Div([
             interval=1000,  # Update every 1 second
             n_intervals=0
         ),
-        dcc.Graph(id='line-graph', className='plot'),
+        dcc.Graph(id='line-graph', className='plot', figure=line_figure()),
         dcc.Graph(id='box-plot', className='plot'),
-        dcc.Store(id='store-data')  # Store for real-time data
+        dcc.Store(id='store-data'),  # Points added since the last update
+        dcc.Store(id='cursor'),  # Sequence number of the last point the browser has
+        dcc.Store(id='graph-width'),  # Pixel width of the line graph
+        dcc.Store(id='line-view')  # Visible time range and number of points drawn
     ], className='dashboard-container')
 ])
 
-# Flask route to receive real-time POST requests
+# Flask route to receive real-time POST requests: one point, a JSON array, NDJSON,
+# msgpack or packed binary records (see ingest.py). The store keeps the last
+# 100000 points, overwriting the oldest.
 @app.server.route('/add_point', methods=['POST'])
 def add_point():
-    global data_store
-    data = request.get_json()
-    if data:
-        try:
-            required_fields = {'latitude', 'longitude', 'timestamp', 'score'}
-            if not required_fields.issubset(data.keys()):
-                return jsonify({'status': 'error', 'message': 'Missing required fields'}), 400
-            
-            # Store the data as-is without converting to DataFrame
-            data_store.append({
-                'latitude': float(data['latitude']),
-                'longitude': float(data['longitude']),
-                'timestamp': data['timestamp'],
-                'score': float(data['score'])
-            })
-            
-            # Keep only the last 100 points to prevent memory issues
-            if len(data_store) > 100000:
-                data_store.pop(0)
-                
-            return jsonify({'status': 'success', 'message': 'Data received'}), 200
-        except Exception as e:
-            return jsonify({'status': 'error', 'message': str(e)}), 400
-    else:
-        return jsonify({'status': 'error', 'message': 'Invalid JSON payload'}), 400
-
-# Line graph callback
+    response, status = ingest_request(data_store, request)
+    return jsonify(response), status
+
+# Score statistics of every point received, overall and per device
+@app.server.route('/stats', methods=['GET'])
+def score_stats():
+    def summary(view):
+        return {key: (None if value != value else value) for key, value in view.summary().items()}  # NaN -> null
+
+    stats = data_store.stats
+    return jsonify({
+        'total': summary(stats.view()),
+        'devices': {data_store.devices[device]: summary(stats.view(device)) for device in list(stats.groups)}
+    })
+
+# The line graph draws a fixed number of points per pixel of its width
+app.clientside_callback(
+    """
+    function(n_intervals, width) {
+        const graph = document.getElementById('line-graph');
+        const current = graph ? graph.offsetWidth : 0;
+        return current && current !== width ? current : window.dash_clientside.no_update;
+    }
+    """,
+    Output('graph-width', 'data'),
+    Input('interval-component', 'n_intervals'),
+    State('graph-width', 'data')
+)
+
+# Line graph callback: the figure holds a downsampled series sized to the graph's
+# width. New points are appended with extendData until they double the drawn
+# points, then the series is downsampled again, so the browser never draws more
+# than a few thousand points however long the history. Zooming redraws the
+# visible time range at full resolution (still capped to the width).
 @app.callback(
-    Output('line-graph', 'figure'),
-    Input('store-data', 'data')
+    [Output('line-graph', 'figure'),
+     Output('line-graph', 'extendData'),
+     Output('line-view', 'data')],
+    [Input('store-data', 'data'),
+     Input('line-graph', 'relayoutData'),
+     Input('graph-width', 'data')],
+    State('line-view', 'data')
 )
-def update_line_graph(data):
-    if not data:
-        return go.Figure()
-    
-    df = pd.DataFrame(json.loads(data))  # Parse JSON string
-    fig = px.line(
-        df,
-        x='timestamp',
-        y='score',
-        markers=True,
-        title='Road Condition Scores Over Time'
-    )
-    fig.update_layout(xaxis_title='Timestamp', yaxis_title='Score')
-    return fig
+def update_line_graph(delta, relayout, width, view):
+    view = view or {'range': None, 'drawn': 0}
+    n_out = target_points(width)
+
+    def redraw(time_range):
+        timestamps, scores = score_series(n_out, time_range)
+        return line_figure(timestamps, scores), no_update, {'range': time_range, 'drawn': len(scores)}
+
+    if ctx.triggered_id == 'line-graph':
+        relayout = relayout or {}
+        if 'xaxis.range[0]' in relayout:
+            bounds = relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+        else:
+            bounds = relayout.get('xaxis.range')
+        if bounds:
+            return redraw([axis_millis(bounds[0]), axis_millis(bounds[1])])
+        if relayout.get('xaxis.autorange'):
+            return redraw(None)
+        return no_update, no_update, no_update
+    if ctx.triggered_id == 'graph-width':
+        return redraw(view['range'])
+
+    if not delta:
+        return no_update, no_update, no_update
+    if delta['reset']:
+        return redraw(view['range'])
+    # While zoomed in, new points fall outside the visible range
+    if not delta['score'] or view['range'] is not None:
+        return no_update, no_update, no_update
+    drawn = view['drawn'] + len(delta['score'])
+    if drawn > 2 * n_out:
+        return redraw(None)
+    return no_update, (dict(x=[delta['timestamp']], y=[delta['score']]), [0]), {'range': None, 'drawn': drawn}
 
 # Pie chart callback
 @app.callback(
     Output('box-plot', 'figure'),
     Input('store-data', 'data')
 )
-def update_pie_chart(data):
-    if not data:
+def update_pie_chart(delta):
+    if not delta:
         return go.Figure()
     
-    df = pd.DataFrame(json.loads(data))  # Parse JSON string
-    ranges = [
-        (0, 20, '#dc3545', 'Very Bad'),
-        (20, 40, '#fd7e14', 'Bad'),
-        (40, 80, '#ffc107', 'Moderate'),
-        (80, 90, '#87cf3a', 'Good'),
-        (90, 100, '#28a745', 'Very Good')
-    ]
-    
+    # Bucket counts are kept up to date on ingest, no need to scan the points
+    counts = data_store.stats.view().buckets.tolist()
     score_distribution = []
     labels = []
     colors = []
-    for min_val, max_val, color, label in ranges:
-        count = len(df[(df['score'] >= min_val) & (df['score'] < max_val)])
+    for (min_val, max_val, color, label), count in zip(SCORE_RANGES, counts):
         if count > 0:
             score_distribution.append(count)
             labels.append(label)
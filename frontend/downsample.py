@@ -0,0 +1,31 @@
+import numpy as np
+
+
+def minmax_indices(y, n_out):
+    """
+    Indices of a min/max envelope of `y` with at most about `n_out` points.
+
+    The series is cut into n_out / 2 equal buckets and each keeps its lowest and
+    highest point (in order), so no local minimum such as a pothole is lost. The
+    first and last points are always kept.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 4:
+        return np.arange(n)
+    size = -(-n // max(1, n_out // 2))
+    buckets = -(-n // size)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    lows = offsets + np.nanargmin(padded, axis=1)
+    highs = offsets + np.nanargmax(padded, axis=1)
+    return np.unique(np.concatenate([[0, n - 1], lows, highs]))
+
+
+def target_points(width_px, points_per_px=2, minimum=200, maximum=5000):
+    """Number of points worth drawing on a graph `width_px` pixels wide."""
+    if not width_px:
+        return 2000
+    return int(min(max(width_px * points_per_px, minimum), maximum))
@@ -0,0 +1,244 @@
+import json
+import re
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; binary clients can send packed records instead
+    msgpack = None
+
+# Packed binary record: little-endian, 32 bytes, timestamp in epoch milliseconds
+RECORD_DTYPE = np.dtype([("latitude", "<f8"), ("longitude", "<f8"), ("score", "<f8"), ("timestamp", "<i8")])
+
+JSON = "application/json"
+NDJSON = "application/x-ndjson"
+MSGPACK = "application/msgpack"
+PACKED = "application/octet-stream"
+
+FIELDS = ("latitude", "longitude", "timestamp", "score")
+MAX_ERRORS = 100
+CHUNK_SIZE = 10000
+
+# UTC offset or "Z" after the time of an ISO timestamp
+_TIMEZONE = re.compile(r"\d{2}:\d{2}(:\d{2}(\.\d+)?)?\s*([zZ]|[+-]\d{2}(:?\d{2})?)$")
+
+
+def _floats(values):
+    """Convert a list to float64, with NaN for anything that is not a number."""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        out = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+def _millis(values):
+    """
+    Convert timestamps (ISO strings or epoch seconds) to epoch milliseconds.
+
+    Stored timestamps are naive, like the ones the devices send. Strings with a
+    timezone are not parsed: converting them to UTC would shift them against the
+    naive ones, so they are flagged in `zoned` instead.
+
+    Returns (millis, ok, zoned) where ok flags the values that could be parsed.
+    """
+    n = len(values)
+    millis = np.zeros(n, dtype=np.int64)
+    ok = np.zeros(n, dtype=bool)
+    is_text = np.array([isinstance(v, str) for v in values], dtype=bool)
+    zoned = np.array([is_text[i] and _TIMEZONE.search(v.strip()) is not None for i, v in enumerate(values)],
+                     dtype=bool)
+
+    text_index = np.flatnonzero(is_text & ~zoned)
+    if len(text_index):
+        texts = [values[i] for i in text_index]
+        try:
+            # Whole batch at once; only fall back to one by one if something is malformed
+            millis[text_index] = np.array(texts, dtype="datetime64[ms]").astype(np.int64)
+            ok[text_index] = True
+        except ValueError:
+            for i, text in zip(text_index, texts):
+                try:
+                    millis[i] = np.datetime64(text, "ms").astype(np.int64)
+                    ok[i] = True
+                except ValueError:
+                    pass
+
+    number_index = np.flatnonzero(~is_text)
+    if len(number_index):
+        seconds = _floats([values[i] for i in number_index])
+        finite = np.isfinite(seconds)
+        millis[number_index[finite]] = np.round(seconds[finite] * 1000).astype(np.int64)
+        ok[number_index[finite]] = True
+    return millis, ok, zoned
+
+
+def validate(records, offset=0):
+    """
+    Validate a batch of point dicts at once.
+
+    Parameters:
+        records (list): Decoded records; anything that is not a dict is rejected.
+        offset (int): Index of the first record in the request, for error reports.
+
+    Returns:
+        tuple: (columns, errors) where columns holds the valid points as arrays
+            (latitude, longitude, score, timestamp in epoch ms, device names) and
+            errors lists {"index", "error"} for every rejected record.
+    """
+    n = len(records)
+    is_dict = np.array([isinstance(r, dict) for r in records], dtype=bool)
+    rows = [r if ok else {} for r, ok in zip(records, is_dict)]
+
+    raw = {field: [r.get(field) for r in rows] for field in FIELDS}
+    latitude = _floats(raw["latitude"])
+    longitude = _floats(raw["longitude"])
+    score = _floats(raw["score"])
+    timestamp, timestamp_ok, timestamp_zoned = _millis(raw["timestamp"])
+    missing = np.zeros(n, dtype=bool)
+    for field in FIELDS:
+        missing |= np.array([value is None for value in raw[field]], dtype=bool)
+
+    # Checks in order; a record is reported with the first one it fails
+    checks = [
+        (~is_dict, "record is not an object"),
+        (missing, "missing required fields (latitude, longitude, timestamp, score)"),
+        (~(np.abs(latitude) <= 90), "latitude must be a number in [-90, 90]"),
+        (~(np.abs(longitude) <= 180), "longitude must be a number in [-180, 180]"),
+        (~((score >= 0) & (score <= 100)), "score must be a number in [0, 100]"),
+        (timestamp_zoned, "timestamp must not have a timezone; send local time without an offset"),
+        (~timestamp_ok, "timestamp must be an ISO date string or epoch seconds"),
+    ]
+    invalid = np.zeros(n, dtype=bool)
+    errors = []
+    for failed, message in checks:
+        new = failed & ~invalid
+        errors.extend({"index": offset + int(i), "error": message} for i in np.flatnonzero(new))
+        invalid |= new
+    errors.sort(key=lambda e: e["index"])
+
+    valid = ~invalid
+    devices = [str(r.get("device", "")) for r, ok in zip(rows, valid) if ok]
+    columns = {
+        "latitude": latitude[valid],
+        "longitude": longitude[valid],
+        "score": score[valid],
+        "timestamp": timestamp[valid],
+        "device": devices,
+    }
+    return columns, errors
+
+
+def store_columns(store, columns):
+    """Append validated columns to a PointStore in one write. Returns the number of points."""
+    names = columns["device"]
+    if isinstance(names, str):
+        device = store.device_id(names)
+    else:
+        unique, inverse = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+        ids = np.array([store.device_id(name) for name in unique.tolist()], dtype=np.int32)
+        device = ids[inverse] if len(ids) else 0
+    store.extend(columns["latitude"], columns["longitude"], columns["score"], columns["timestamp"], device)
+    return len(columns["latitude"])
+
+
+def ingest_records(store, records, offset=0):
+    """Validate decoded records and store the valid ones. Returns (accepted, errors)."""
+    columns, errors = validate(records, offset)
+    return store_columns(store, columns), errors
+
+
+def ingest_packed(store, data, device=""):
+    """Store packed RECORD_DTYPE records. Returns (accepted, errors)."""
+    if len(data) % RECORD_DTYPE.itemsize:
+        return 0, [{"index": 0, "error": f"body is not a whole number of {RECORD_DTYPE.itemsize}-byte records"}]
+    packed = np.frombuffer(data, dtype=RECORD_DTYPE)
+    invalid = ~((np.abs(packed["latitude"]) <= 90) & (np.abs(packed["longitude"]) <= 180)
+                & (packed["score"] >= 0) & (packed["score"] <= 100))
+    errors = [{"index": int(i), "error": "coordinates or score out of range"} for i in np.flatnonzero(invalid)]
+    valid = packed[~invalid]
+    columns = {name: valid[name] for name in RECORD_DTYPE.names}
+    columns["device"] = device
+    return store_columns(store, columns), errors
+
+
+def ingest_ndjson(store, lines):
+    """Validate and store newline-delimited JSON as it streams in, a chunk at a time."""
+    accepted = 0
+    errors = []
+    chunk, offset = [], 0
+    for index, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            chunk.append(None)
+        else:
+            try:
+                chunk.append(json.loads(line))
+            except ValueError:
+                chunk.append(None)
+                errors.append({"index": index, "error": "invalid JSON"})
+        if len(chunk) >= CHUNK_SIZE:
+            accepted += _ingest_lines(store, chunk, offset, errors)
+            offset += len(chunk)
+            chunk = []
+    if chunk:
+        accepted += _ingest_lines(store, chunk, offset, errors)
+    return accepted, errors
+
+
+def _ingest_lines(store, chunk, offset, errors):
+    # Blank and unparsable lines are skipped here; the latter are already reported
+    index = [i for i, record in enumerate(chunk) if record is not None]
+    columns, chunk_errors = validate([chunk[i] for i in index])
+    errors.extend({"index": offset + index[e["index"]], "error": e["error"]} for e in chunk_errors)
+    errors.sort(key=lambda e: e["index"])
+    return store_columns(store, columns)
+
+
+def ingest_request(store, request):
+    """
+    Ingest every point of a Flask request into a PointStore.
+
+    Accepts one JSON object, a JSON array of objects, newline-delimited JSON (read
+    as it streams in), msgpack (if installed) or packed RECORD_DTYPE records (device
+    name in the `device` query parameter). Valid points are stored even when others
+    in the same request are rejected.
+
+    Returns:
+        tuple: (response dict, HTTP status). The response holds the accepted and
+            rejected counts and the first MAX_ERRORS errors with their record index.
+    """
+    content_type = (request.mimetype or JSON).lower()
+    try:
+        if content_type == NDJSON:
+            accepted, errors = ingest_ndjson(store, request.stream)
+        elif content_type == PACKED:
+            accepted, errors = ingest_packed(store, request.get_data(), request.args.get("device", ""))
+        elif content_type == MSGPACK:
+            if msgpack is None:
+                return {"status": "error", "message": "msgpack is not installed on the server"}, 415
+            payload = msgpack.unpackb(request.get_data(), raw=False)
+            accepted, errors = ingest_records(store, payload if isinstance(payload, list) else [payload])
+        else:
+            payload = request.get_json(silent=True)
+            if payload is None:
+                return {"status": "error", "message": "Invalid JSON payload"}, 400
+            accepted, errors = ingest_records(store, payload if isinstance(payload, list) else [payload])
+    except Exception as e:
+        return {"status": "error", "message": str(e)}, 400
+
+    response = {
+        "status": "success" if not errors else "partial" if accepted else "error",
+        "accepted": accepted,
+        "rejected": len(errors),
+        "errors": errors[:MAX_ERRORS],
+    }
+    if errors:
+        response["message"] = errors[0]["error"]
+    return response, 200 if accepted or not errors else 400
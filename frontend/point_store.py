@@ -0,0 +1,153 @@
+import threading
+
+import numpy as np
+
+
+def format_millis(millis):
+    """Format an array of epoch milliseconds as 'YYYY-MM-DD HH:MM:SS' strings."""
+    text = np.asarray(millis, dtype=np.int64).astype("datetime64[ms]").astype("datetime64[s]").astype(str)
+    return np.char.replace(text, "T", " ")
+
+
+class PointStore:
+    """
+    Fixed-size, columnar ring buffer of road condition points.
+
+    Points are kept in preallocated NumPy columns (latitude, longitude, score,
+    timestamp in epoch milliseconds, device ID) written in a circular layout, so
+    an append is O(1) and memory never grows. Every point gets a sequence number
+    that keeps increasing across wrap-arounds; the point with sequence `seq` lives
+    in row `seq % capacity` until `capacity` newer points have been added.
+
+    Appends are serialized by a lock. Readers get zero-copy views of the columns
+    through `segments`; a view can be overwritten by later appends, so readers that
+    keep it around should check `valid(start_seq)` after using it.
+
+    Parameters:
+        capacity (int): Number of points kept.
+        stats (GroupedScoreStats): Score statistics updated with every point
+            added, grouped by device ID. They cover every point ever added,
+            including those since overwritten. None disables them.
+    """
+
+    COLUMNS = ("latitude", "longitude", "score", "timestamp", "device")
+
+    def __init__(self, capacity=100000, stats=None):
+        self.capacity = capacity
+        self.stats = stats
+        self.latitude = np.zeros(capacity, dtype=np.float64)
+        self.longitude = np.zeros(capacity, dtype=np.float64)
+        self.score = np.zeros(capacity, dtype=np.float64)
+        self.timestamp = np.zeros(capacity, dtype=np.int64)
+        self.device = np.zeros(capacity, dtype=np.int32)
+
+        # Device names are interned to small integer IDs
+        self.devices = []
+        self._device_ids = {}
+
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    @property
+    def seq(self):
+        """Sequence number the next point will get (= number of points ever added)."""
+        return self._seq
+
+    @property
+    def first_seq(self):
+        """Sequence number of the oldest point still stored."""
+        return max(0, self._seq - self.capacity)
+
+    def __len__(self):
+        return min(self._seq, self.capacity)
+
+    def device_id(self, name):
+        """ID of a device name, registering it on first use."""
+        device = self._device_ids.get(name)
+        if device is None:
+            with self._lock:
+                device = self._device_ids.get(name)
+                if device is None:
+                    device = len(self.devices)
+                    self.devices.append(name)
+                    self._device_ids[name] = device
+        return device
+
+    def append(self, latitude, longitude, score, timestamp, device=0):
+        """Add one point (timestamp in epoch milliseconds) and return its sequence number."""
+        with self._lock:
+            seq = self._seq
+            row = seq % self.capacity
+            self.latitude[row] = latitude
+            self.longitude[row] = longitude
+            self.score[row] = score
+            self.timestamp[row] = timestamp
+            self.device[row] = device
+            self._seq = seq + 1
+        if self.stats is not None:
+            self.stats.add(score, device)
+        return seq
+
+    def extend(self, latitude, longitude, score, timestamp, device=0):
+        """Add equally long arrays of points at once. Returns the sequence number of the first."""
+        latitude = np.asarray(latitude, dtype=np.float64)
+        n = len(latitude)
+        # Check every column before writing any, so a bad batch leaves the store untouched
+        values = {}
+        for name, column in zip(self.COLUMNS, (latitude, longitude, score, timestamp, device)):
+            try:
+                values[name] = np.asarray(column, dtype=getattr(self, name).dtype)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} values are not numbers") from None
+            if values[name].shape not in ((), (n,)):
+                raise ValueError(f"{name} has {values[name].size} values, expected {n} or 1")
+            values[name] = np.broadcast_to(values[name], (n,))
+        with self._lock:
+            first = self._seq
+            if n == 0:
+                return first
+            # Only the newest `capacity` points can survive the write
+            skip = max(0, n - self.capacity)
+            start = (first + skip) % self.capacity
+            count = n - skip
+            head = min(count, self.capacity - start)
+            for name in self.COLUMNS:
+                column = getattr(self, name)
+                column_values = values[name][skip:]
+                column[start:start + head] = column_values[:head]
+                column[:count - head] = column_values[head:]
+            self._seq = first + n
+        if self.stats is not None:
+            self.stats.add(score, device)
+        return first
+
+    def segments(self, since=None):
+        """
+        Zero-copy views of the points from sequence number `since` (default: the oldest) on.
+
+        Returns a list of up to two (start_seq, columns) pairs in chronological order,
+        where columns maps every column name to a view of that contiguous run.
+        """
+        with self._lock:
+            end = self._seq
+        start = self.first_seq if since is None else max(since, end - self.capacity, 0)
+        segments = []
+        while start < end:
+            row = start % self.capacity
+            stop = min(end - start, self.capacity - row) + row
+            segments.append((start, {name: getattr(self, name)[row:stop] for name in self.COLUMNS}))
+            start += stop - row
+        return segments
+
+    def columns(self, since=None):
+        """The points from `since` on as contiguous arrays (copied only when they wrap around)."""
+        segments = self.segments(since)
+        if not segments:
+            return {name: getattr(self, name)[:0] for name in self.COLUMNS}
+        if len(segments) == 1:
+            return segments[0][1]
+        return {name: np.concatenate([columns[name] for _, columns in segments]) for name in self.COLUMNS}
+
+    def valid(self, start_seq):
+        """True if the point with sequence number `start_seq` has not been overwritten yet."""
+        return start_seq >= self.first_seq
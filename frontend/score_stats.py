@@ -0,0 +1,165 @@
+import threading
+
+import numpy as np
+
+# Resolution of the quantile sketch: scores are validated to [0, 100] on ingest,
+# so a fixed 0.1-wide histogram bounds the quantile error to 0.05 points and
+# merges exactly by adding counts
+SKETCH_MIN = 0.0
+SKETCH_MAX = 100.0
+SKETCH_BINS = 1000
+
+
+class ScoreStats:
+    """
+    Streaming summary of a set of scores, updated a batch at a time.
+
+    Keeps counts per score range, count/mean/variance (Welford, merged per batch
+    with Chan's formula), min/max and a fixed-bin quantile sketch. Every query
+    costs the same however many scores were added, and two summaries merge
+    exactly, so per-device or per-file views add up to the global one.
+
+    Parameters:
+        edges (list): Bucket edges, e.g. [0, 20, 40, 60, 80, 100]. A score falls
+            in [edges[i], edges[i + 1]); the top edge itself goes to the last bucket.
+    """
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.buckets = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.sketch = np.zeros(SKETCH_BINS, dtype=np.int64)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @classmethod
+    def from_scores(cls, edges, scores):
+        stats = cls(edges)
+        stats.add(scores)
+        return stats
+
+    def add(self, scores):
+        """Add an array (or a single value) of scores."""
+        scores = np.atleast_1d(np.asarray(scores, dtype=np.float64))
+        scores = scores[np.isfinite(scores)]
+        n = len(scores)
+        if not n:
+            return
+
+        index = np.searchsorted(self.edges, scores, side="right") - 1
+        index[scores == self.edges[-1]] = len(self.buckets) - 1
+        inside = (index >= 0) & (index < len(self.buckets))
+        self.buckets += np.bincount(index[inside], minlength=len(self.buckets))
+        self.sketch += np.bincount(_sketch_bins(scores), minlength=SKETCH_BINS)
+
+        mean = float(scores.mean())
+        self._combine(n, mean, float(((scores - mean) ** 2).sum()))
+        self.min = min(self.min, float(scores.min()))
+        self.max = max(self.max, float(scores.max()))
+
+    def merge(self, other):
+        """Add another summary with the same edges into this one."""
+        if not other.count:
+            return
+        self.buckets += other.buckets
+        self.sketch += other.sketch
+        self._combine(other.count, other.mean, other.m2)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _combine(self, n, mean, m2):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    @property
+    def std(self):
+        """Sample standard deviation (like pandas), NaN below two scores."""
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else float("nan")
+
+    def quantile(self, q):
+        """Approximate q-quantile, interpolated between order statistics like numpy/pandas."""
+        if not self.count:
+            return float("nan")
+        cumulative = np.cumsum(self.sketch)
+        position = q * (self.count - 1)
+        below = int(position)
+        low = self._order_statistic(cumulative, below)
+        high = self._order_statistic(cumulative, min(below + 1, self.count - 1))
+        value = low + (high - low) * (position - below)
+        return float(min(max(value, self.min), self.max))
+
+    def _order_statistic(self, cumulative, rank):
+        # Scores of a bin are taken as evenly spread over its width
+        index = int(np.searchsorted(cumulative, rank, side="right"))
+        before = cumulative[index - 1] if index else 0
+        width = (SKETCH_MAX - SKETCH_MIN) / SKETCH_BINS
+        return SKETCH_MIN + (index + (rank - before + 0.5) / self.sketch[index]) * width
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "min": self.min if self.count else float("nan"),
+            "max": self.max if self.count else float("nan"),
+            "mean": self.mean if self.count else float("nan"),
+            "std": self.std,
+            "median": self.quantile(0.5),
+            "p10": self.quantile(0.1),
+            "p90": self.quantile(0.9),
+        }
+
+
+def _sketch_bins(scores):
+    scaled = (scores - SKETCH_MIN) * (SKETCH_BINS / (SKETCH_MAX - SKETCH_MIN))
+    return np.clip(scaled.astype(np.int64), 0, SKETCH_BINS - 1)
+
+
+class GroupedScoreStats:
+    """
+    Global ScoreStats plus one per group (device, file, ...), safe to update from
+    several request threads.
+
+    Parameters:
+        edges (list): Bucket edges shared by every view (see ScoreStats).
+    """
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.total = ScoreStats(edges)
+        self.groups = {}
+        self._lock = threading.Lock()
+
+    def add(self, scores, keys=None):
+        """
+        Add scores to the global view and to their groups.
+
+        Parameters:
+            scores (array): Scores of the batch.
+            keys: One group key for the whole batch, an array with one key per
+                score, or None to only update the global view.
+        """
+        scores = np.atleast_1d(np.asarray(scores, dtype=np.float64))
+        batches = []
+        if keys is not None and np.ndim(keys):
+            unique, inverse = np.unique(np.asarray(keys), return_inverse=True)
+            batches = [(key, scores[inverse == i]) for i, key in enumerate(unique.tolist())]
+        elif keys is not None:
+            batches = [(keys.item() if isinstance(keys, np.generic) else keys, scores)]
+
+        with self._lock:
+            self.total.add(scores)
+            for key, values in batches:
+                group = self.groups.get(key)
+                if group is None:
+                    group = self.groups[key] = ScoreStats(self.edges)
+                group.add(values)
+
+    def view(self, key=None):
+        """The global summary, or the one of group `key` (empty if it has no scores)."""
+        if key is None:
+            return self.total
+        return self.groups.get(key) or ScoreStats(self.edges)
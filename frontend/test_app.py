@@ -0,0 +1,47 @@
+import importlib
+import sys
+
+import pytest
+
+pytest.importorskip("dash")
+pytest.importorskip("pandas")
+pytest.importorskip("geopy")
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    # app.py lists ./data when it is imported, so import it from a scratch directory
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    (data_dir / "drive.csv").write_text(
+        "latitude,longitude,timestamp,score\n"
+        "34.0522,-118.2437,2024-11-10 09:15:23,87\n"
+        "40.7128,-74.0060,2024-11-10 09:16:45,92\n"
+        "51.5074,-0.1278,2024-11-10 09:17:12,45\n"
+        "35.6762,139.6503,2024-11-10 09:18:01,15\n"
+    )
+    monkeypatch.chdir(tmp_path)
+    sys.modules.pop("app", None)
+    module = importlib.import_module("app")
+    # No reverse geocoding over the network
+    monkeypatch.setattr(module, "get_location_name", lambda lat, lon, cache: f"({lat:.2f}, {lon:.2f})")
+    yield module
+    sys.modules.pop("app", None)
+
+
+def test_load_and_prepare_data_fills_file_stats(app_module):
+    records, file_info = app_module.load_and_prepare_data("drive.csv")
+
+    assert records is not None and len(records) == 4
+    assert "Error" not in str(file_info)
+
+    stats = app_module.file_stats["drive.csv"]
+    assert stats.count == 4
+    assert stats.min == 15 and stats.max == 92
+    assert stats.mean == pytest.approx((87 + 92 + 45 + 15) / 4)
+    assert stats.buckets.tolist() == [1, 0, 1, 0, 2]
+
+    table = app_module.update_table(records, "drive.csv")
+    assert "No data" not in str(table)
+    pie = app_module.update_pie_chart(records, "drive.csv")
+    assert list(pie.data[0].values) == [1, 1, 2]
@@ -0,0 +1,18 @@
+import warnings
+
+from ingest import validate
+
+
+def record(timestamp):
+    return {"latitude": 37.45, "longitude": 126.66, "score": 80, "timestamp": timestamp}
+
+
+def test_validate_rejects_timezone_suffixed_timestamps():
+    timestamps = ["2024-11-10 09:15:23", "2024-11-10T09:15:23Z", "2024-11-10T09:15:23+09:00", 1731230123.5]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        columns, errors = validate([record(t) for t in timestamps])
+
+    assert columns["timestamp"].tolist() == [1731230123000, 1731230123500]
+    assert [e["index"] for e in errors] == [1, 2]
+    assert all("timezone" in e["error"] for e in errors)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from point_store import PointStore
+
+
+def test_extend_wraps_around_the_ring():
+    store = PointStore(capacity=4)
+    store.extend([1, 2, 3], [1, 2, 3], [10, 20, 30], [1000, 2000, 3000])
+    first = store.extend([4, 5, 6], [4, 5, 6], [40, 50, 60], [4000, 5000, 6000], device=1)
+
+    assert first == 3 and store.seq == 6 and len(store) == 4
+    columns = [columns for _, columns in store.segments()]
+    assert np.concatenate([c["latitude"] for c in columns]).tolist() == [3, 4, 5, 6]
+    assert np.concatenate([c["device"] for c in columns]).tolist() == [0, 1, 1, 1]
+
+
+@pytest.mark.parametrize("score", [[10, 20], ["a", "b", "c"]])
+def test_extend_rejects_bad_columns_without_writing(score):
+    store = PointStore(capacity=4)
+    store.extend([1, 2, 3, 4], [1, 2, 3, 4], [10, 20, 30, 40], [1, 2, 3, 4])
+
+    with pytest.raises(ValueError, match="score"):
+        store.extend([5, 6, 7], [5, 6, 7], score, [5, 6, 7])
+
+    assert store.seq == 4
+    assert store.latitude.tolist() == [1, 2, 3, 4]
+    assert store.score.tolist() == [10, 20, 30, 40]
@@ -1,17 +1,36 @@
 from ultralytics import YOLO
 import cv2
 import os
+import sys
+import time
 
-def process_video(video_path, model_path="weights/best.pt", output_dir="output.avi", conf_thresh=0.25, iou_thresh=0.5, save=False):
+# The stage pipeline, metrics and scoring are shared with the Raspberry Pi backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "raspberry_pi"))
+from metrics import StageMetrics
+from pipeline import Pipeline, BLOCK, DROP_OLDEST
+from scoring import boxes_to_numpy, score_detections
+
+def process_video(video_path, model_path="weights/best.pt", output_dir="output.avi", conf_thresh=0.25, iou_thresh=0.5, save=False,
+                  queue_size=4, drop_policy=None, headless=False, metrics_path=None):
     """
     Process a video file using a YOLO model to perform object detection and save results.
 
+    Decoding, inference, scoring, annotation and writing run as pipelined stages
+    connected by bounded queues. In `headless` mode without `save`, frames are
+    neither annotated nor displayed.
+
     Parameters:
-        video_path (str): Path to the input video file.
+        video_path (str or int): Path to the input video file, or a camera index.
         model_path (str): Path to the YOLO model weights file.
         output_frames_dir (str): Directory to save processed frames.
         conf_thresh (float): Confidence threshold for detection.
         iou_thresh (float): IoU threshold for detection.
+        queue_size (int): Capacity of the queues between stages.
+        drop_policy (str): "block" or "drop_oldest". Defaults to "drop_oldest" for
+            live cameras and "block" for files.
+        headless (bool): Run without a preview window or GUI event loop.
+        metrics_path (str): Append periodic per-stage latency and FPS snapshots to this
+            JSON-lines file. The timings are always printed at the end.
     """
     # Load the YOLO model
     model = YOLO(model_path)
@@ -31,60 +50,88 @@ def process_video(video_path, model_path="weights/best.pt", output_dir="output.a
         print(f"Error: Could not open video {video_path}")
         return
 
-    
-    frame_num = 0
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("End of video or failed to capture frame.")
-            break
-        
-        # Get frame dimensions and area
-        area = frame.shape[0] * frame.shape[1]
-        frame_num += 1
+    if drop_policy is None:
+        drop_policy = DROP_OLDEST if isinstance(video_path, int) else BLOCK
+    pipeline = Pipeline(queue_size=queue_size, drop_policy=drop_policy)
+    metrics = StageMetrics(metrics_path)
 
+    def decode():
+        while True:
+            start = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                print("End of video or failed to capture frame.")
+                break
+            metrics.record("decode", time.perf_counter() - start)
+            yield {"frame": frame}
+
+    def infer(item):
         # Run inference on the frame
-        results = model(frame, conf=conf_thresh, iou=iou_thresh)
-        
-        # Initialize total boxes area
-        boxes_area = 0
-        
-        for result in results:
-            boxes = result.boxes  # Use the boxes property
-            for box in boxes:
-                x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())  # Bounding box coordinates
-                w = x2 - x1
-                h = y2 - y1
-                boxes_area += w * h
-                conf = box.conf[0].item()  # Confidence score
-                cls = int(box.cls[0].item())  # Class ID
+        item["results"] = model(item["frame"], conf=conf_thresh, iou=iou_thresh)
+        return item
 
-                # Draw the bounding box and label
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(frame, f"Class: {cls}, Conf: {conf:.2f}",
-                            (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    def score(item):
+        # Score the union of the damaged area, like the device does
+        height, width = item["frame"].shape[:2]
+        item["detections"] = boxes_to_numpy(item["results"])
+        item["score"], _ = score_detections(item["detections"], width, height)
+        return item
+
+    def annotate(item):
+        frame = item["frame"]
+        for x1, y1, x2, y2, conf, cls in item["detections"]:
+            x1, y1, x2, y2, cls = int(x1), int(y1), int(x2), int(y2), int(cls)
+            # Draw the bounding box and label
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(frame, f"Class: {cls}, Conf: {conf:.2f}",
+                        (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
         
-        # Calculate and display the score
-        score = 1 - (boxes_area / area)
-        cv2.putText(frame, f"Score: {score:.2f}",
+        # Display the score
+        cv2.putText(frame, f"Score: {item['score']:.2f}",
                     (30, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 2)
-        # fps
-        # cv2.putText(frame, f"FPS: {fps:.2f}",
-        #            (30, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 2)
-        
-        
+        # Rolling FPS of the whole loop
+        cv2.putText(frame, f"FPS: {metrics.fps:.2f}",
+                    (30, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 2)
+        return item
+
+    def write(item):
         # Save the processed frame
         # cv2.imwrite(os.path.join(output_frames_dir, f"frame_{frame_num}.jpg"), frame)
-        if save:
-            out.write(frame)
-        
-        
+        out.write(item["frame"])
+        return item
+
+    frame_num = 0
+
+    def display(item):
+        nonlocal frame_num
+        frame_num += 1
+        metrics.frame_done()
+        if headless:
+            return
+
         # Display the frame
-        cv2.imshow("frame", frame)
+        cv2.imshow("frame", item["frame"])
         if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+            pipeline.stop()
 
-    # Release resources
-    cap.release()
-    cv2.destroyAllWindows()
+    pipeline.add_stage("infer", metrics.timed("infer", infer))
+    pipeline.add_stage("score", metrics.timed("score", score))
+    # Only annotate when a sink needs the pixels
+    if save or not headless:
+        pipeline.add_stage("annotate", metrics.timed("annotate", annotate))
+    if save:
+        pipeline.add_stage("write", metrics.timed("write", write))
+    pipeline.add_stage("display", metrics.timed("display", display))
+    try:
+        pipeline.run(decode())
+    finally:
+        # Release resources
+        cap.release()
+        if save:
+            out.release()
+        if not headless:
+            cv2.destroyAllWindows()
+        if metrics_path is not None:
+            metrics.export()
     print(f"Processed {frame_num} frames. Saved results in {output_dir}.")
+    print(metrics.report())
@@ -1,6 +1,13 @@
 import cv2
 from ultralytics import YOLO
+import numpy as np
 import os
+import sys
+
+# The frame archiver and scoring are shared with the Raspberry Pi backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend", "raspberry_pi"))
+from archiver import FrameArchiver
+from scoring import boxes_to_numpy, score_detections
 
 # Load the YOLO model
 model = YOLO("best.pt")  # Adjust the path to your model weights
@@ -8,56 +15,70 @@ model = YOLO("best.pt")  # Adjust the path to your model weights
 # Initialize video capture (use 0 for live camera or replace with video file path)
 cap = cv2.VideoCapture(0)  # Change to 'videos/sample.mp4' for testing with a video file
 
-# Ensure frames directory exists for saving processed frames
-os.makedirs("frames", exist_ok=True)
+# HEADLESS=1 skips drawing and the preview window; frames are only annotated
+# when something needs the pixels (the preview or the saved frames)
+HEADLESS = os.environ.get("HEADLESS", "0") == "1"
+SAVE_FRAMES = os.environ.get("SAVE_FRAMES", "0" if HEADLESS else "1") == "1"
+DRAW = SAVE_FRAMES or not HEADLESS
+
+# Saved frames are sampled and JPEG-encoded by background threads so the loop
+# never waits on the SD card; directories rotate by size to bound disk usage
+if SAVE_FRAMES:
+    archiver = FrameArchiver(
+        "frames",
+        every_n=int(os.environ.get("ARCHIVE_EVERY", "1")),
+        only_detections=os.environ.get("ARCHIVE_DETECTIONS", "0") == "1",
+        below_score=float(os.environ["ARCHIVE_BELOW"]) if "ARCHIVE_BELOW" in os.environ else None,
+        quality=int(os.environ.get("JPEG_QUALITY", "80")),
+    ).start()
+
+# Preallocated buffers: the camera decodes into `capture` and the resize writes
+# into `frame`, so the loop does not allocate a new image every iteration
+capture = None
+frame = np.empty((480, 640, 3), dtype=np.uint8)  # Adjust resolution as needed
 
 frame_num = 0  # Frame counter
 while cap.isOpened():
-    ret, frame = cap.read()
+    ret, captured = cap.read(capture)
     if not ret:
         print("End of video or failed to capture frame.")
         break
+    capture = captured
     
     # Resize frame for faster processing (optional, adjust size for your use case)
-    frame = cv2.resize(frame, (640, 480))  # Adjust resolution as needed
+    cv2.resize(capture, (frame.shape[1], frame.shape[0]), dst=frame)
 
-    # Get frame area
-    area = frame.shape[0] * frame.shape[1]
     frame_num += 1
 
     # Run inference on the frame
     results = model(frame, conf=0.25, iou=0.5)  # Adjust confidence and IoU thresholds as needed
 
-    # Extract bounding boxes and class information
-    boxes_area = 0
-    for result in results:
-        boxes = result.boxes  # Use the boxes property
-        for box in boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())  # Bounding box coordinates
-            w = x2 - x1
-            h = y2 - y1
-            boxes_area += w * h
-            conf = box.conf[0].item()  # Confidence score
-            cls = int(box.cls[0].item())  # Class ID
-
-            # Draw the bounding box if confidence is above the threshold
+    # Score the union of the damaged area, like the device does
+    detected = boxes_to_numpy(results)
+    score, _ = score_detections(detected, frame.shape[1], frame.shape[0])
+    if DRAW:
+        for x1, y1, x2, y2, conf, cls in detected:
+            x1, y1, x2, y2, cls = int(x1), int(y1), int(x2), int(y2), int(cls)
+            # Draw the bounding box and label
             cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
             cv2.putText(frame, f"Class: {cls}, Conf: {conf:.2f}",
                         (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-    
-    # Calculate score
-    score = 1 - (boxes_area / area)
-    cv2.putText(frame, f"Score: {score:.2f}",
-                (30, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 2)
+        cv2.putText(frame, f"Score: {score:.2f}",
+                    (30, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 2)
 
-    # Save processed frame to disk
-    cv2.imwrite(f'frames/frame_{frame_num}.jpg', frame)
+    # Queue the processed frame for archiving
+    if SAVE_FRAMES:
+        archiver.submit(frame_num, frame, detections=detected, score=score)
 
     # Display the frame (optional for debugging)
-    cv2.imshow("YOLOv8 Detection", frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):  # Exit when 'q' is pressed
-        break
+    if not HEADLESS:
+        cv2.imshow("YOLOv8 Detection", frame)
+        if cv2.waitKey(1) & 0xFF == ord('q'):  # Exit when 'q' is pressed
+            break
 
 # Release resources
 cap.release()
-cv2.destroyAllWindows()
+if SAVE_FRAMES:
+    archiver.stop()
+if not HEADLESS:
+    cv2.destroyAllWindows()
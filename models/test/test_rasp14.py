@@ -1,63 +1,87 @@
-from picamera2 import Picamera2
 from ultralytics import YOLO
 import cv2
 import numpy as np
 import os
+import sys
+
+# The frame archiver, camera source, change gate and scoring are shared with the Raspberry Pi backend
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "backend", "raspberry_pi"))
+from archiver import FrameArchiver
+from change_gate import ChangeGate
+from frame_pool import PicameraSource
+from scoring import boxes_to_numpy, score_detections
 
 # Load the YOLO model
 model = YOLO("weights/best.pt")  # Path to your trained YOLOv8 weights
 
 # Initialize PiCamera2
-picam = Picamera2()
-camera_config = picam.create_preview_configuration(main={"size": (640, 480), "format": "RGB888"})
-picam.configure(camera_config)
-picam.start()
+camera = PicameraSource(size=(640, 480), pool_size=0)
+
+# HEADLESS=1 skips drawing and the preview window; frames are only annotated
+# when something needs the pixels (the preview or the saved frames)
+HEADLESS = os.environ.get("HEADLESS", "0") == "1"
+SAVE_FRAMES = os.environ.get("SAVE_FRAMES", "0" if HEADLESS else "1") == "1"
+DRAW = SAVE_FRAMES or not HEADLESS
+
+# Saved frames are sampled and JPEG-encoded by background threads so the loop
+# never waits on the SD card; directories rotate by size to bound disk usage
+if SAVE_FRAMES:
+    archiver = FrameArchiver(
+        "frames",
+        every_n=int(os.environ.get("ARCHIVE_EVERY", "1")),
+        only_detections=os.environ.get("ARCHIVE_DETECTIONS", "0") == "1",
+        below_score=float(os.environ["ARCHIVE_BELOW"]) if "ARCHIVE_BELOW" in os.environ else None,
+        quality=int(os.environ.get("JPEG_QUALITY", "80")),
+    ).start()
 
-# Ensure frames directory exists for saving processed frames
-os.makedirs("frames", exist_ok=True)
+# Skip inference (and the saved frame) while the scene stays the same: a tiny
+# grayscale thumbnail is compared with the one of the last inferred frame
+gate = ChangeGate(float(os.environ.get("CHANGE_THRESH", "4.0")))
+
+# Preallocated frame buffer: each capture is copied into it from the camera's
+# mapped buffer instead of allocating a new array with capture_array()
+frame = np.empty((480, 640, 3), dtype=np.uint8)
 
 frame_num = 0  # Frame counter
 while True:
     # Capture frame from PiCamera2
-    frame = picam.capture_array()
+    camera.read_into(frame)
 
-    # Get frame area
-    area = frame.shape[0] * frame.shape[1]
     frame_num += 1
 
-    # Run inference on the frame
-    results = model(frame, conf=0.25, iou=0.5)  # Adjust confidence and IoU thresholds as needed
-
-    # Extract bounding boxes and class information
-    boxes_area = 0
-    for result in results:
-        boxes = result.boxes  # Use the boxes property
-        for box in boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())  # Bounding box coordinates
-            w = x2 - x1
-            h = y2 - y1
-            boxes_area += w * h
-            conf = box.conf[0].item()  # Confidence score
-            cls = int(box.cls[0].item())  # Class ID
-
-            # Draw the bounding box if confidence is above the threshold
+    changed = gate.should_infer(frame)
+    if changed:
+        # Run inference on the frame
+        results = model(frame, conf=0.25, iou=0.5)  # Adjust confidence and IoU thresholds as needed
+    # Otherwise reuse the previous detections
+
+    # Score the union of the damaged area, like the device does
+    detected = boxes_to_numpy(results)
+    score, _ = score_detections(detected, frame.shape[1], frame.shape[0])
+    if DRAW:
+        for x1, y1, x2, y2, conf, cls in detected:
+            x1, y1, x2, y2, cls = int(x1), int(y1), int(x2), int(y2), int(cls)
+            # Draw the bounding box and label
             cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
             cv2.putText(frame, f"Class: {cls}, Conf: {conf:.2f}",
                         (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-    
-    # Calculate the score for the frame
-    score = 1 - (boxes_area / area)
-    cv2.putText(frame, f"Score: {score:.2f}",
-                (30, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 2)
+        cv2.putText(frame, f"Score: {score:.2f}",
+                    (30, 30), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 255, 0), 2)
 
-    # Save processed frame to disk
-    cv2.imwrite(f'frames/frame_{frame_num}.jpg', frame)
+    # Queue the processed frame for archiving
+    if SAVE_FRAMES and changed:
+        archiver.submit(frame_num, frame, detections=detected, score=score)
 
     # Display the frame (optional for debugging)
-    cv2.imshow("YOLOv8 Detection", frame)
-    if cv2.waitKey(1) & 0xFF == ord('q'):  # Exit when 'q' is pressed
-        break
+    if not HEADLESS:
+        cv2.imshow("YOLOv8 Detection", frame)
+        if cv2.waitKey(1) & 0xFF == ord('q'):  # Exit when 'q' is pressed
+            break
 
 # Release resources
-picam.close()
-cv2.destroyAllWindows()
+camera.close()
+if SAVE_FRAMES:
+    archiver.stop()
+print(gate.stats())
+if not HEADLESS:
+    cv2.destroyAllWindows()